@@ -0,0 +1,133 @@
+import asyncio
+import logging
+import time
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class MicroBatcher:
+    """
+    微批处理调度器
+
+    把并发到达的单帧输入在很短的时间窗口内合并成一个批次，
+    只调用一次批量推理，再把每一帧的结果分发回各自的请求。
+    队列与后台任务在首次 submit 时按当前运行的事件循环创建，
+    事件循环更换（如测试中多次 asyncio.run、重复启动应用）时重新创建。
+    """
+
+    def __init__(self,
+                 run_batch: Callable[[np.ndarray], List[Any]],
+                 max_batch_size: int = 8,
+                 max_wait_ms: float = 5.0,
+                 pool: Optional[Any] = None):
+        """
+        Args:
+            run_batch: 批量推理函数，输入 (N, C, H, W) 数组，返回长度为 N 的结果列表
+            max_batch_size: 单个批次的最大帧数
+            max_wait_ms: 收到第一帧后等待凑批的最长时间（毫秒）
+            pool: 执行批量推理的工作池（需提供 async run(fn, *args)），None 时使用默认线程池
+        """
+        self._run_batch = run_batch
+        self._pool = pool
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self._queue: "Optional[asyncio.Queue[Tuple[np.ndarray, asyncio.Future]]]" = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._batch_sizes: Counter = Counter()
+        self._max_queue_depth = 0
+
+    def _ensure_worker(self) -> None:
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            # 旧事件循环上的队列与 future 无法在新循环中使用，直接丢弃
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._worker = None
+        if self._worker is None or self._worker.done():
+            self._worker = loop.create_task(self._run())
+            self._worker.add_done_callback(self._on_worker_done)
+
+    @staticmethod
+    def _on_worker_done(task: asyncio.Task) -> None:
+        # 后台任务异常退出时异常不会被 await，在这里记录；下一次 submit 会重新创建任务
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("微批处理后台任务异常退出", exc_info=task.exception())
+
+    async def submit(self, image_array: np.ndarray) -> Any:
+        """
+        提交一帧预处理后的输入并等待其推理结果
+
+        Args:
+            image_array: 形状为 (1, C, H, W) 的输入数组
+
+        Returns:
+            该帧对应的推理结果
+        """
+        self._ensure_worker()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((image_array, future))
+        self._max_queue_depth = max(self._max_queue_depth, self._queue.qsize())
+        return await future
+
+    async def _collect(self) -> List[Tuple[np.ndarray, asyncio.Future]]:
+        items = [await self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(items) < self.max_batch_size:
+            try:
+                items.append(self._queue.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            # 以1ms为粒度轮询，避免 wait_for 取消 get() 时丢失已出队的帧
+            await asyncio.sleep(min(remaining, 0.001))
+        return items
+
+    async def _run_group(self, items: List[Tuple[np.ndarray, asyncio.Future]]) -> None:
+        self._batch_sizes[len(items)] += 1
+        try:
+            batch = np.concatenate([array for array, _ in items], axis=0)
+            if self._pool is not None:
+                results = await self._pool.run(self._run_batch, batch)
+            else:
+                results = await asyncio.get_running_loop().run_in_executor(None, self._run_batch, batch)
+        except Exception as e:
+            for _, future in items:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future), result in zip(items, results):
+            if not future.done():
+                future.set_result(result)
+
+    async def _run(self) -> None:
+        while True:
+            items = await self._collect()
+            # 丢弃已被取消的请求（例如客户端断开）
+            items = [(array, future) for array, future in items if not future.done()]
+            # 输入尺寸不同的帧（整帧与人脸裁剪）无法拼接，按形状分组推理
+            groups: Dict[Tuple[int, ...], List[Tuple[np.ndarray, asyncio.Future]]] = {}
+            for array, future in items:
+                groups.setdefault(array.shape[1:], []).append((array, future))
+            for group in groups.values():
+                await self._run_group(group)
+
+    def stats(self) -> dict:
+        """返回当前队列深度与批大小分布"""
+        return {
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "max_queue_depth": self._max_queue_depth,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000.0,
+            "batches": sum(self._batch_sizes.values()),
+            "batch_size_histogram": {
+                str(size): count for size, count in sorted(self._batch_sizes.items())
+            },
+        }
@@ -1,94 +1,120 @@
+import logging
 import os
-import cv2
 import numpy as np
-import onnxruntime as ort
-from fastapi import  HTTPException
-from typing import List, Dict, Any
-
-# 加载ONNX模型
-def load_onnx_model(model_path: str):
-    try:
-        session = ort.InferenceSession(model_path)
-        print("模型加载成功")
-        return session
-    except Exception as e:
-        print(f"模型加载失败: {str(e)}")
-        raise
-
-# 等比例缩放函数（保持与训练时相同）
-def resize_image_aspect_ratio(image: np.ndarray,target_size = (800, 800) ): # 根据模型输入要求修改) -> np.ndarray:
-    h, w = image.shape[:2]
-    target_h, target_w = target_size
-
-    scale = min(target_h / h, target_w / w)
-    new_w = int(w * scale)
-    new_h = int(h * scale)
-
-    resized_image = cv2.resize(image, (new_w, new_h))
-    
-    top = (target_h - new_h) // 2
-    bottom = target_h - new_h - top
-    left = (target_w - new_w) // 2
-    right = target_w - new_w - left
+from typing import Dict, Any, Tuple
+from cvmodals.model_registry import registry
+from cvmodals.preprocessing import EYE_INPUT_SIZE, letterbox_geometry, preprocess_letterbox
+from metrics import metrics
+from log_config import DebugSampler
 
-    padded_image = cv2.copyMakeBorder(
-        resized_image, top, bottom, left, right, 
-        cv2.BORDER_CONSTANT, value=(0, 0, 0)
-    )
-    return padded_image
+logger = logging.getLogger(__name__)
+_debug_sample = DebugSampler(logger)
 
 # 预处理函数
 def preprocess(image: np.ndarray) -> np.ndarray:
-    print(f"原始图像形状: {image.shape}")
-    # 转换颜色空间 BGR -> RGB
-    image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-    
-    # 缩放和填充
-    processed = resize_image_aspect_ratio(image)
-    
-    # 归一化 (根据模型需要调整)
-    processed = processed.astype(np.float32) / 255.0
-    
-    # 转换为CHW格式并添加batch维度
-    processed = np.transpose(processed, (2, 0, 1))
-    processed = np.expand_dims(processed, axis=0)
-    print(f"预处理后图像形状: {processed.shape}")
+    # BGR -> RGB、缩放填充、归一化和 CHW 转换一次完成，写入线程私有的复用缓冲区
+    processed = preprocess_letterbox(image, EYE_INPUT_SIZE, reuse_buffer=True)
+    if _debug_sample():
+        logger.debug("眼部预处理: %s -> %s", image.shape, processed.shape)
     return processed
 
-def parse_onnx_output(outputs, score_threshold=0.5):
+# 可选的检测框筛选：保留得分最高的前 K 个框（0 表示不限制），
+# 以及按类别的非极大值抑制 IoU 阈值（0 表示不做 NMS，模型导出时通常已内置 NMS）
+EYE_TOP_K = int(os.environ.get('HUC_EYE_TOP_K', 0))
+EYE_NMS_IOU = float(os.environ.get('HUC_EYE_NMS_IOU', 0))
+
+
+def nms(boxes: np.ndarray, scores: np.ndarray, iou_threshold: float, top_k: int = 0) -> np.ndarray:
+    """
+    贪心非极大值抑制（NumPy 实现）
+
+    每轮取剩余得分最高的框，用向量运算一次算出它与其余所有框的 IoU，
+    剔除重叠超过阈值的框。
+
+    Args:
+        boxes: (N, 4) 的 [x1, y1, x2, y2]
+        scores: (N,) 置信度
+        iou_threshold: IoU 超过该值的框被抑制
+        top_k: 最多保留的框数，0 表示不限制
+
+    Returns:
+        保留框的下标，按得分降序
+    """
+    x1, y1, x2, y2 = boxes[:, 0], boxes[:, 1], boxes[:, 2], boxes[:, 3]
+    areas = np.maximum(x2 - x1, 0) * np.maximum(y2 - y1, 0)
+    order = np.argsort(-scores, kind='stable')
+    keep = []
+    while order.size:
+        i = order[0]
+        keep.append(i)
+        if top_k and len(keep) >= top_k:
+            break
+        rest = order[1:]
+        inter = (np.maximum(np.minimum(x2[i], x2[rest]) - np.maximum(x1[i], x1[rest]), 0)
+                 * np.maximum(np.minimum(y2[i], y2[rest]) - np.maximum(y1[i], y1[rest]), 0))
+        iou = inter / np.maximum(areas[i] + areas[rest] - inter, 1e-9)
+        order = rest[iou <= iou_threshold]
+    return np.asarray(keep, dtype=np.intp)
+
+
+def select_detections(dets: np.ndarray,
+                      labels: np.ndarray,
+                      score_threshold: float,
+                      top_k: int = 0,
+                      nms_iou: float = 0.0) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    按置信度过滤检测框，可选 NMS 与 top-K
+
+    不做 NMS / top-K 时保持模型输出的原始顺序，否则按得分降序。
+
+    Args:
+        dets: (N, 5) 的 [x1, y1, x2, y2, score]
+        labels: (N,) 类别
+        score_threshold: 置信度阈值
+        top_k: 最多保留的框数，0 表示不限制
+        nms_iou: NMS 的 IoU 阈值，0 表示不做 NMS
+
+    Returns:
+        过滤后的 (dets, labels)
+    """
+    mask = dets[:, 4] >= score_threshold
+    dets, labels = dets[mask], labels[mask]
+    if nms_iou > 0 and len(dets) > 1:
+        # 按类别平移坐标，使不同类别的框互不重叠，一次 NMS 即完成按类别抑制
+        offsets = labels.astype(np.float32)[:, None] * (float(np.abs(dets[:, :4]).max()) + 1.0) * 2
+        keep = nms(dets[:, :4] + offsets, dets[:, 4], nms_iou, top_k)
+        dets, labels = dets[keep], labels[keep]
+    elif top_k and len(dets) > top_k:
+        keep = np.argsort(-dets[:, 4], kind='stable')[:top_k]
+        dets, labels = dets[keep], labels[keep]
+    return dets, labels
+
+
+def parse_onnx_output(outputs, score_threshold=0.5, top_k=0, nms_iou=0.0):
     """解析动态维度输出的ONNX检测结果"""
     # 获取实际输出张量
     dets_tensor = outputs[0]  # 形状 (1, N, 5)
     labels_tensor = outputs[1]  # 形状 (1, N)
 
-    # print(f"检测结果形状: {dets_tensor.shape}, 标签形状: {labels_tensor.shape}")
-
     # 动态获取实际检测数N
     N = dets_tensor.shape[1]  # 运行时实际维度值
     
     # 验证输出一致性
     assert N == labels_tensor.shape[1], f"检测数不一致 dets:{N} vs labels:{labels_tensor.shape[1]}"
-    print(f"检测数: {N}")
-    # 转换为numpy数组
-    dets = dets_tensor[0]  # 形状 (N, 5) → [x1, y1, x2, y2, score]
-    labels = labels_tensor[0]  # 形状 (N,)
-
     # 过滤低置信度检测
-    valid_mask = dets[:, 4] >= score_threshold
-    valid_dets = dets[valid_mask]
-    valid_labels = labels[valid_mask]
-
-    # 组织输出格式
-    results = []
-    for det, label in zip(valid_dets, valid_labels):
-        results.append({
-            'bbox': det[:4].tolist(),    # 坐标
-            'score': float(det[4]),      # 置信度
-            'label': int(label)          # 类别
-        })
+    valid_dets, valid_labels = select_detections(
+        dets_tensor[0], labels_tensor[0], score_threshold, top_k, nms_iou)
+
+    # 整列转换为 Python 类型后再组织输出格式
+    results = [
+        {'bbox': bbox, 'score': score, 'label': label}
+        for bbox, score, label in zip(valid_dets[:, :4].tolist(),
+                                      valid_dets[:, 4].tolist(),
+                                      valid_labels.astype(np.int64).tolist())
+    ]
     
-    # 调试信息
-    print(f"原始检测数: {N} → 有效检测数: {len(results)}")
+    if _debug_sample():
+        logger.debug("原始检测数: %d → 有效检测数: %d", N, len(results))
     return results
 
 
@@ -96,138 +122,108 @@ def pos_process(outputs,
                   original_shape, 
                   resized_shape,
                   class_names=['eyes'],
-                  score_threshold=0.3): 
+                  score_threshold=0.3,
+                  padding=(0, 0),
+                  top_k=0,
+                  nms_iou=0.0): 
     """
     参数：
         outputs: ONNX模型输出
         original_shape: 原始图像尺寸 (height, width)
-        resized_shape: 预处理后尺寸 (height, width)
+        resized_shape: 缩放后有效图像区域的尺寸 (height, width)
         class_names: 类别名称映射表
         score_threshold: 置信度阈值
+        padding: 等比例缩放时上方和左侧的填充像素 (top, left)
+        top_k: 最多保留的检测框数，0 表示不限制
+        nms_iou: NMS 的 IoU 阈值，0 表示不做 NMS
     返回：
         JSON格式的检测结果列表
     """
-    # 解析模型输出
-    detections = []
-    
     # 获取输出张量
     dets = outputs[0][0]  # [N,5]
     labels = outputs[1][0]  # [N,]
+    if _debug_sample():
+        logger.debug("眼部检测输出: dets %s, labels %s", dets.shape, labels.shape)
+
+    # 过滤、NMS 与 top-K 都在数组上完成，之后只为保留的框构建字典
+    dets, labels = select_detections(dets, labels, score_threshold, top_k, nms_iou)
     
     # 计算尺寸缩放比例
     orig_h, orig_w = original_shape
     resize_h, resize_w = resized_shape
     scale_x = orig_w / resize_w
     scale_y = orig_h / resize_h
-    
-    for i in range(dets.shape[0]):
-        # 提取基础数据
-        x1, y1, x2, y2, score = dets[i]
-        print("dets:" + str(dets))
-        
-        # 过滤低置信度
-        if score < score_threshold:
-            continue
-        
-        # 坐标映射到原始图像
-        x1 = int(round(x1 * scale_x))
-        y1 = int(round(y1 * scale_y))
-        x2 = int(round(x2 * scale_x))
-        y2 = int(round(y2 * scale_y))
-        
-        # 边界保护
-        x1 = max(0, min(x1, orig_w-1))
-        y1 = max(0, min(y1, orig_h-1))
-        x2 = max(x1+1, min(x2, orig_w))
-        y2 = max(y1+1, min(y2, orig_h))
-        
-        # 处理标签
-        label = int(labels[i])
-        label_text = class_names[label] if label < len(class_names) else f'unknown_{label}'
-        # print("label:" + str(labels))
-        # print("label_text:" + str(class_names))
-        # 构建检测项
-        detection = {
-            "x1": x1,
-            "y1": y1,
-            "x2": x2,
-            "y2": y2,
-            "score": round(float(score), 4),  # 保留4位小数
+    pad_top, pad_left = padding
+
+    # 坐标映射到原始图像（rint 与内置 round 一样四舍六入五成双）
+    boxes = dets[:, :4].astype(np.float64)
+    xs = np.rint((boxes[:, [0, 2]] - pad_left) * scale_x).astype(np.int64)
+    ys = np.rint((boxes[:, [1, 3]] - pad_top) * scale_y).astype(np.int64)
+
+    # 边界保护
+    x1 = np.clip(xs[:, 0], 0, orig_w - 1)
+    y1 = np.clip(ys[:, 0], 0, orig_h - 1)
+    x2 = np.maximum(x1 + 1, np.minimum(xs[:, 1], orig_w))
+    y2 = np.maximum(y1 + 1, np.minimum(ys[:, 1], orig_h))
+
+    # 处理标签
+    label_list = labels.astype(np.int64).tolist()
+    label_texts = {label: class_names[label] if label < len(class_names) else f'unknown_{label}'
+                   for label in set(label_list)}
+
+    # 构建检测项
+    return [
+        {
+            "x1": a,
+            "y1": b,
+            "x2": c,
+            "y2": d,
+            "score": round(score, 4),  # 保留4位小数
             "label": label,
-            "label_text": label_text
+            "label_text": label_texts[label]
         }
-        detections.append(detection)
-    
-    return detections
-
-# 计算原始图像尺寸
-def get_image_size_with_opencv(image_bytes):
-    """通过OpenCV获取图像尺寸"""
-    try:
-        # 将字节数据转为numpy数组
-        nparr = np.frombuffer(image_bytes, np.uint8)
-        
-        # 解码图像（不实际处理像素数据）
-        img = cv2.imdecode(nparr, cv2.IMREAD_UNCHANGED)
-        
-        if img is None:
-            raise ValueError("无法解码图像数据")
-            
-        # OpenCV返回的形状为 (height, width, channels)
-        return img.shape[0], img.shape[1]
-    
-    except Exception as e:
-        raise RuntimeError(f"尺寸获取失败: {str(e)}")
+        for a, b, c, d, score, label in zip(x1.tolist(), y1.tolist(), x2.tolist(), y2.tolist(),
+                                             dets[:, 4].tolist(), label_list)
+    ]
+
+def detect_eyes(image: np.ndarray) -> Dict[str, Any]:
+    """
+    在已解码的BGR图像上运行眼部检测
 
+    Args:
+        image: (H, W, 3) BGR 图像
 
-def predict_eye(image_data: bytes) -> Dict[str, Any]:
-    
-    eye_Path = os.path.join(os.path.dirname(__file__),  'eye.onnx')
-    model_session = load_onnx_model(eye_Path)
-
-    try:
-        # 将字节数据转换为numpy数组
-        nparr = np.frombuffer(image_data, np.uint8)
-        
-        # 解码图片（自动识别格式）
-        image = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-        if image is None:
-            raise ValueError("无法解码图片数据")
-
-        # 预处理（
-        input_tensor = preprocess(image) 
-        # 模型推理
-        input_name = model_session.get_inputs()[0].name
-        # input_shape = model_session.get_inputs()[0].shape
-        # input_type = model_session.get_inputs()[0].type
-        # print(f"模型输入名称: {input_name}")
-        # print(f"模型输入形状: {input_shape}")
-        # print(f"模型输入类型: {input_type}")
-
-        print(input_tensor.shape)
-        # 运行推理
-        output_names = [o.name for o in model_session.get_outputs()]
-        print(f"模型输出名称: {output_names}")
-        print(f"模型输出形状: {[o.shape for o in model_session.get_outputs()]}")
-        print(f"模型输出类型: {[o.type for o in model_session.get_outputs()]}")
+    Returns:
+        包含原图尺寸与检测框列表的字典
+    """
+    model_session = registry.get('eye')
+
+    # 预处理
+    with metrics.timer('eye.preprocess'):
+        input_tensor = preprocess(image)
+    # 模型推理
+    input_name = model_session.get_inputs()[0].name
+
+    # 运行推理
+    output_names = [o.name for o in model_session.get_outputs()]
+    with metrics.timer('eye.session_run'):
         outputs = model_session.run(output_names, {input_name: input_tensor})
-        original_h, original_w = get_image_size_with_opencv(image_data)
-        resized_h, resized_w = [800, 800]  # 预处理后的图像尺寸
-        # 生成结果
+    original_h, original_w = image.shape[:2]
+    # 检测框位于等比例缩放加填充后的坐标系中
+    resized_h, resized_w, top, left = letterbox_geometry(original_h, original_w, *EYE_INPUT_SIZE)
+    # 生成结果
+    with metrics.timer('eye.postprocess'):
         detection_results = pos_process(
             outputs=outputs,
             original_shape=(original_h, original_w),
-            resized_shape=(resized_h, resized_w)
+            resized_shape=(resized_h, resized_w),
+            padding=(top, left),
+            top_k=EYE_TOP_K,
+            nms_iou=EYE_NMS_IOU
         )
 
-        # 生成JSON数据
-        return {
-            "image_size": {"width": original_w, "height": original_h},
-            "detections": detection_results
-        }
-
-    except ValueError as ve:
-        raise HTTPException(400, f"无效的图片数据: {str(ve)}")
-    except Exception as e:
-        raise HTTPException(500, f"处理错误: {str(e)}")
-
+    # 生成JSON数据
+    return {
+        "image_size": {"width": original_w, "height": original_h},
+        "detections": detection_results
+    }
@@ -0,0 +1,229 @@
+import os
+import time
+from collections import deque
+from typing import Dict, List, Optional
+
+
+def eye_aspect(detections: List[Dict], min_width: float = 0.0, max_eyes: int = 2) -> Optional[float]:
+    """
+    由眼部检测框估算眼睛张开程度
+
+    张开程度取检测框的高宽比：闭眼时框明显变扁，且与人脸到摄像头的距离无关。
+    宽度小于 min_width 像素的框分辨率太低，不参与计算。
+
+    Args:
+        detections: pos_process 返回的检测框列表
+        min_width: 检测框的最小宽度（像素）
+        max_eyes: 最多使用置信度最高的几个框
+
+    Returns:
+        高宽比的平均值，没有可用检测框时返回 None
+    """
+    boxes = [d for d in detections if d["x2"] - d["x1"] >= max(min_width, 1)]
+    if not boxes:
+        return None
+    if len(boxes) > max_eyes:
+        boxes = sorted(boxes, key=lambda d: d["score"], reverse=True)[:max_eyes]
+    return sum((d["y2"] - d["y1"]) / (d["x2"] - d["x1"]) for d in boxes) / len(boxes)
+
+
+class EyeStateEngine:
+    """
+    单个会话的眼部状态引擎
+
+    每帧由检测框的高宽比判断睁眼 / 闭眼：高宽比低于会话内睁眼基线的 closed_ratio 倍
+    视为闭眼，基线用睁眼帧的指数移动平均自适应不同用户和摄像头角度。
+    没有可用检测框（离开画面、框太小）的帧记为 unknown，会结束当前的闭眼，
+    但不计为一次眨眼；相邻两帧间隔超过 max_blink 时中间可能藏着一次睁眼，
+    同样结束当前的闭眼。
+
+    最近 window 秒内的状态保存在有界环形缓冲区中，眨眼次数与闭眼帧数作为
+    窗口内的计数器随样本进出增减，每帧更新为均摊 O(1)：
+    - 眨眼：持续 min_blink ~ max_blink 秒的一次闭眼；
+    - blink_rate：窗口内每分钟眨眼次数。眨眼只有在帧率足够高时才看得到，
+      窗口内平均帧间隔超过 max_frame_interval（如前端每 5 秒一帧）、
+      或不到一半的帧能判断眼部状态时，blink_state 为 unknown、
+      blink_rate 为 None，不据此提醒；
+    - closure：当前这次闭眼已持续的秒数；
+    - perclos：窗口内可判断状态的帧中闭眼帧所占比例。
+
+    提醒条件（两次提醒至少间隔 repeat_interval 秒）：
+    - 持续闭眼超过 long_closure 秒（每次闭眼只提醒一次）；
+    - 观察满一个窗口、且 blink_state 为 tracked 时，
+      眨眼频率低于 low_blink_rate 次/分钟（长时间盯屏、用眼疲劳）。
+    """
+
+    OPEN = 'open'
+    CLOSED = 'closed'
+    UNKNOWN = 'unknown'
+
+    def __init__(self,
+                 window: float = 60.0,
+                 capacity: int = 1800,
+                 baseline_alpha: float = 0.05,
+                 closed_ratio: float = 0.6,
+                 min_blink: float = 0.05,
+                 max_blink: float = 0.5,
+                 long_closure: float = 2.0,
+                 low_blink_rate: float = 8.0,
+                 repeat_interval: float = 300.0,
+                 max_frame_interval: float = 0.1):
+        """
+        Args:
+            window: 统计眨眼频率的时间窗口（秒）
+            capacity: 环形缓冲区最多保存的帧数，帧率很高时提前淘汰最旧的帧
+            baseline_alpha: 睁眼基线的 EMA 平滑系数
+            closed_ratio: 高宽比低于基线的该比例时视为闭眼
+            min_blink: 一次眨眼的最短闭眼时长（秒）
+            max_blink: 一次眨眼的最长闭眼时长（秒），更长的闭眼不计为眨眼
+            long_closure: 持续闭眼多少秒后提醒
+            low_blink_rate: 眨眼频率低于该值（次/分钟）时提醒
+            repeat_interval: 两次提醒之间的最小间隔（秒）
+            max_frame_interval: 统计眨眼频率所需的最大平均帧间隔（秒），默认约 10 fps
+        """
+        self.window = window
+        self.baseline_alpha = baseline_alpha
+        self.closed_ratio = closed_ratio
+        self.min_blink = min_blink
+        self.max_blink = max_blink
+        self.long_closure = long_closure
+        self.low_blink_rate = low_blink_rate
+        self.repeat_interval = repeat_interval
+        self.max_frame_interval = max_frame_interval
+        # (时间, 状态, 本帧是否结束了一次眨眼)
+        self._samples: deque = deque(maxlen=capacity)
+        self._blinks = 0
+        self._closed_frames = 0
+        self._known_frames = 0
+        self.baseline: Optional[float] = None
+        self.aspect: Optional[float] = None
+        self.state = self.UNKNOWN
+        self.total_blinks = 0
+        self._started: Optional[float] = None
+        self._closed_since: Optional[float] = None
+        self._closure_alerted = False
+        self._last_alert = float('-inf')
+
+    def _append(self, now: float, state: str, blink: bool) -> None:
+        samples = self._samples
+        # 手动淘汰，保证窗口计数与缓冲区内容一致
+        while samples and (len(samples) == samples.maxlen or samples[0][0] < now - self.window):
+            _, old_state, old_blink = samples.popleft()
+            self._blinks -= old_blink
+            self._closed_frames -= old_state == self.CLOSED
+            self._known_frames -= old_state != self.UNKNOWN
+        samples.append((now, state, blink))
+        self._blinks += blink
+        self._closed_frames += state == self.CLOSED
+        self._known_frames += state != self.UNKNOWN
+
+    def _classify(self, aspect: Optional[float]) -> str:
+        if aspect is None:
+            return self.UNKNOWN
+        if self.baseline is None:
+            self.baseline = aspect
+            return self.OPEN
+        if aspect < self.baseline * self.closed_ratio:
+            return self.CLOSED
+        self.baseline += self.baseline_alpha * (aspect - self.baseline)
+        return self.OPEN
+
+    @property
+    def closure(self) -> float:
+        """当前这次闭眼已持续的秒数，未闭眼时为 0"""
+        if self._closed_since is None or not self._samples:
+            return 0.0
+        return self._samples[-1][0] - self._closed_since
+
+    def _span(self) -> float:
+        """缓冲区覆盖的时间跨度；帧率很高时缓冲区按容量淘汰，跨度会小于 window"""
+        return self._samples[-1][0] - self._samples[0][0] if self._samples else 0.0
+
+    def blinks_observable(self) -> bool:
+        """窗口内的平均帧间隔是否足以观察到眨眼，且至少一半的帧能判断眼部状态"""
+        span = self._span()
+        return (span > 0
+                and span / (len(self._samples) - 1) <= self.max_frame_interval
+                and self._known_frames * 2 >= len(self._samples))
+
+    def blink_rate(self) -> Optional[float]:
+        """窗口内每分钟眨眼次数，帧率不足以观察眨眼时返回 None"""
+        if not self.blinks_observable():
+            return None
+        return self._blinks * 60.0 / self._span()
+
+    def perclos(self) -> float:
+        """窗口内可判断状态的帧中闭眼帧所占比例"""
+        return self._closed_frames / self._known_frames if self._known_frames else 0.0
+
+    def update(self, detections: List[Dict],
+               thresholds: Dict[str, float],
+               now: Optional[float] = None) -> bool:
+        """
+        输入一帧眼部检测框并推进状态
+
+        Args:
+            detections: 当前帧的眼部检测框
+            thresholds: 用户设置的阈值，eyeWidth 为可用眼部检测框的最小宽度（像素）
+            now: 帧时间（单调时钟秒），默认取当前时间
+
+        Returns:
+            本帧是否触发了一次提醒
+        """
+        now = time.monotonic() if now is None else now
+        if self._started is None:
+            self._started = now
+        self.aspect = eye_aspect(detections, thresholds.get('eyeWidth') or 0.0)
+        state = self._classify(self.aspect)
+
+        if self._samples and now - self._samples[-1][0] > self.max_blink:
+            # 两帧之间可能睁过眼，不能把两次闭眼帧连成一次持续闭眼
+            self._closed_since = None
+        blink = False
+        if state == self.CLOSED:
+            if self._closed_since is None:
+                self._closed_since, self._closure_alerted = now, False
+        elif self._closed_since is not None:
+            blink = state == self.OPEN and self.min_blink <= now - self._closed_since <= self.max_blink
+            self._closed_since = None
+        self.state = state
+        self.total_blinks += blink
+        self._append(now, state, blink)
+
+        if now - self._last_alert < self.repeat_interval:
+            return False
+        if self._closed_since is not None and not self._closure_alerted and now - self._closed_since >= self.long_closure:
+            self._closure_alerted = True
+            self._last_alert = now
+            return True
+        if now - self._started < self.window:
+            return False
+        blink_rate = self.blink_rate()
+        if blink_rate is not None and blink_rate < self.low_blink_rate:
+            self._last_alert = now
+            return True
+        return False
+
+    def snapshot(self) -> dict:
+        blink_rate = self.blink_rate()
+        return {
+            "state": self.state,
+            "aspect": round(self.aspect, 3) if self.aspect is not None else None,
+            "blink_state": "tracked" if blink_rate is not None else self.UNKNOWN,
+            "blink_rate": round(blink_rate, 1) if blink_rate is not None else None,
+            "blinks": self.total_blinks,
+            "closure": round(self.closure, 2),
+            "perclos": round(self.perclos(), 3),
+        }
+
+
+def create_eye_engine() -> EyeStateEngine:
+    """按环境变量配置创建眼部状态引擎"""
+    return EyeStateEngine(
+        window=float(os.environ.get('HUC_EYE_WINDOW', 60.0)),
+        closed_ratio=float(os.environ.get('HUC_EYE_CLOSED_RATIO', 0.6)),
+        long_closure=float(os.environ.get('HUC_EYE_LONG_CLOSURE', 2.0)),
+        low_blink_rate=float(os.environ.get('HUC_EYE_LOW_BLINK_RATE', 8.0)),
+        repeat_interval=float(os.environ.get('HUC_EYE_REPEAT_INTERVAL', 300.0)),
+        max_frame_interval=float(os.environ.get('HUC_EYE_MAX_FRAME_INTERVAL', 0.1)),
+    )
@@ -0,0 +1,92 @@
+import os
+from typing import List, Optional, Tuple
+
+# 以双眼外接框宽度为单位估算人脸区域
+FACE_SCALE_FROM_EYES = 2.4
+# 只检测到单眼时，以单眼框宽度为单位估算人脸区域
+FACE_SCALE_FROM_EYE = 5.0
+
+
+class FaceROITracker:
+    """
+    单个会话的人脸区域跟踪器
+
+    以眼部检测框估计人脸的正方形区域，并用指数平滑跨帧跟踪，
+    使姿态模型只处理人脸裁剪图而不是整幅画面。连续 max_misses 帧
+    没有检测到眼睛时放弃当前区域，回退到整帧推理。
+    """
+
+    def __init__(self, smoothing: float = 0.5, max_misses: int = 5):
+        """
+        Args:
+            smoothing: 新估计值的权重，越大越跟随最新检测
+            max_misses: 连续多少帧未检测到眼睛后重置区域
+        """
+        self.smoothing = smoothing
+        self.max_misses = max_misses
+        # (cx, cy, size)，None 表示尚未定位
+        self._state: Optional[Tuple[float, float, float]] = None
+        self._misses = 0
+
+    @staticmethod
+    def estimate(detections: List[dict]) -> Optional[Tuple[float, float, float]]:
+        """根据得分最高的两个眼部检测框估计人脸中心与边长"""
+        if not detections:
+            return None
+        eyes = sorted(detections, key=lambda d: d["score"], reverse=True)[:2]
+        x1 = min(d["x1"] for d in eyes)
+        y1 = min(d["y1"] for d in eyes)
+        x2 = max(d["x2"] for d in eyes)
+        y2 = max(d["y2"] for d in eyes)
+        width = x2 - x1
+        size = width * (FACE_SCALE_FROM_EYES if len(eyes) == 2 else FACE_SCALE_FROM_EYE)
+        # 眼睛位于人脸上半部分，中心向下偏移
+        cx = (x1 + x2) / 2
+        cy = (y1 + y2) / 2 + size * 0.15
+        return cx, cy, size
+
+    def update(self, detections: List[dict]) -> None:
+        estimate = self.estimate(detections)
+        if estimate is None:
+            self._misses += 1
+            if self._misses >= self.max_misses:
+                self._state = None
+            return
+        self._misses = 0
+        if self._state is None:
+            self._state = estimate
+        else:
+            self._state = tuple(
+                old + self.smoothing * (new - old) for old, new in zip(self._state, estimate)
+            )
+
+    def roi(self, image_shape: Tuple[int, ...]) -> Optional[Tuple[int, int, int, int]]:
+        """
+        当前人脸区域在图像中的坐标 (x1, y1, x2, y2)，未定位时返回 None
+
+        Args:
+            image_shape: 图像形状 (H, W, ...)
+        """
+        if self._state is None:
+            return None
+        height, width = image_shape[:2]
+        cx, cy, size = self._state
+        half = min(size, width, height) / 2
+        # 区域整体平移到画面内，保持正方形
+        x1 = int(min(max(cx - half, 0), width - 2 * half))
+        y1 = int(min(max(cy - half, 0), height - 2 * half))
+        side = int(2 * half)
+        if side < 16:
+            return None
+        return x1, y1, x1 + side, y1 + side
+
+
+def face_roi_enabled() -> bool:
+    return os.environ.get('HUC_FACE_ROI', '0').lower() in ('1', 'true', 'yes')
+
+
+def create_face_tracker() -> FaceROITracker:
+    return FaceROITracker(
+        smoothing=float(os.environ.get('HUC_FACE_ROI_SMOOTHING', 0.5)),
+        max_misses=int(os.environ.get('HUC_FACE_ROI_MAX_MISSES', 5)),
+    )
@@ -0,0 +1,66 @@
+import os
+from typing import Any, Dict, Optional, Tuple
+
+import cv2
+import numpy as np
+
+# 用于比较画面变化的缩略图尺寸 (W, H)
+THUMBNAIL_SIZE = (32, 24)
+
+
+def frame_thumbnail(image_data: bytes, size: Tuple[int, int] = THUMBNAIL_SIZE) -> np.ndarray:
+    """
+    生成用于画面变化检测的灰度缩略图
+
+    JPEG 以 1/8 比例直接解码为灰度图，开销远小于完整解码。
+
+    Raises:
+        ValueError: 图像数据无法解码
+    """
+    image = cv2.imdecode(np.frombuffer(image_data, np.uint8), cv2.IMREAD_REDUCED_GRAYSCALE_8)
+    if image is None:
+        raise ValueError("无法解码图片数据")
+    return cv2.resize(image, size, interpolation=cv2.INTER_AREA)
+
+
+class SceneChangeFilter:
+    """
+    单个会话的画面变化预过滤器
+
+    与上一次真正推理的帧的缩略图比较平均灰度差，差异低于阈值时
+    直接复用上一次的分析结果，不再运行模型。始终与上一次推理的帧
+    比较（而不是上一帧），缓慢的累积变化最终也会触发重新推理。
+    """
+
+    def __init__(self, threshold: float = 4.0):
+        """
+        Args:
+            threshold: 平均每像素灰度差（0-255）低于该值视为画面未变化，0 表示关闭过滤
+        """
+        self.threshold = threshold
+        self._thumbnail: Optional[np.ndarray] = None
+        self._result: Optional[Dict[str, Any]] = None
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, thumbnail: np.ndarray) -> Optional[Dict[str, Any]]:
+        """画面未明显变化时返回缓存的结果，否则返回 None"""
+        if (self.threshold > 0
+                and self._result is not None
+                and self._thumbnail.shape == thumbnail.shape
+                and cv2.norm(thumbnail, self._thumbnail, cv2.NORM_L1) / thumbnail.size < self.threshold):
+            self.hits += 1
+            return self._result
+        self.misses += 1
+        return None
+
+    def store(self, thumbnail: np.ndarray, result: Dict[str, Any]) -> None:
+        self._thumbnail = thumbnail
+        self._result = result
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses}
+
+
+def create_scene_filter() -> SceneChangeFilter:
+    return SceneChangeFilter(threshold=float(os.environ.get('HUC_SCENE_DIFF_THRESHOLD', 4.0)))
@@ -0,0 +1,157 @@
+import logging
+import os
+import threading
+import time
+from typing import Dict, Iterable, Optional, Tuple
+
+import numpy as np
+import onnxruntime as ort
+
+logger = logging.getLogger(__name__)
+
+MODEL_DIR = os.path.dirname(__file__)
+
+# 模型名称 -> (文件名, 预热时使用的输入尺寸 (H, W))
+MODEL_SPECS: Dict[str, Tuple[str, Tuple[int, int]]] = {
+    'pose': ('resnet34.onnx', (320, 320)),
+    'eye': ('eye.onnx', (800, 800)),
+}
+
+_GRAPH_OPT_LEVELS = {
+    'disable': ort.GraphOptimizationLevel.ORT_DISABLE_ALL,
+    'basic': ort.GraphOptimizationLevel.ORT_ENABLE_BASIC,
+    'extended': ort.GraphOptimizationLevel.ORT_ENABLE_EXTENDED,
+    'all': ort.GraphOptimizationLevel.ORT_ENABLE_ALL,
+}
+
+
+def build_session_options() -> ort.SessionOptions:
+    """
+    根据环境变量构建ONNX运行时会话配置
+
+    HUC_ORT_INTRA_OP_THREADS: 单个算子内部的线程数（0表示由运行时决定）
+    HUC_ORT_INTER_OP_THREADS: 算子之间并行的线程数（0表示由运行时决定）
+    HUC_ORT_GRAPH_OPT: 图优化级别 disable/basic/extended/all
+    """
+    options = ort.SessionOptions()
+    options.intra_op_num_threads = int(os.environ.get('HUC_ORT_INTRA_OP_THREADS', 0))
+    options.inter_op_num_threads = int(os.environ.get('HUC_ORT_INTER_OP_THREADS', 0))
+    opt_level = os.environ.get('HUC_ORT_GRAPH_OPT', 'all').lower()
+    options.graph_optimization_level = _GRAPH_OPT_LEVELS.get(
+        opt_level, ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    )
+    return options
+
+
+def warmup_session(session: ort.InferenceSession, input_size: Tuple[int, int]) -> None:
+    """用全零输入跑一次推理，提前完成内存分配和算子初始化"""
+    model_input = session.get_inputs()[0]
+    height, width = input_size
+    # 动态维度（字符串或None）按 [batch, channel, H, W] 的顺序补全
+    defaults = [1, 3, height, width]
+    shape = [
+        dim if isinstance(dim, int) and dim > 0 else defaults[i]
+        for i, dim in enumerate(model_input.shape)
+    ]
+    dummy = np.zeros(shape, dtype=np.float32)
+    session.run(None, {model_input.name: dummy})
+
+
+class ModelRegistry:
+    """
+    进程级ONNX模型注册表
+
+    每个模型只加载一次并在所有请求间共享；首次使用时懒加载，
+    加载后立即预热。模型文件在磁盘上被替换时会自动重新加载。
+    """
+
+    def __init__(self,
+                 specs: Dict[str, Tuple[str, Tuple[int, int]]],
+                 model_dir: str = MODEL_DIR,
+                 reload_check_interval: float = 2.0):
+        """
+        Args:
+            specs: 模型名称到 (文件名, 预热输入尺寸) 的映射
+            model_dir: 模型文件所在目录
+            reload_check_interval: 检查模型文件是否变化的最小间隔（秒）
+        """
+        self._specs = specs
+        self._model_dir = model_dir
+        self._reload_check_interval = reload_check_interval
+        self._sessions: Dict[str, ort.InferenceSession] = {}
+        self._mtimes: Dict[str, float] = {}
+        self._last_checked: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def model_path(self, name: str) -> str:
+        if name not in self._specs:
+            raise KeyError(f"未注册的模型: {name}")
+        return os.path.join(self._model_dir, self._specs[name][0])
+
+    def _load(self, name: str) -> ort.InferenceSession:
+        path = self.model_path(name)
+        mtime = os.path.getmtime(path)
+        session = ort.InferenceSession(
+            path,
+            sess_options=build_session_options(),
+            providers=['CPUExecutionProvider'],
+        )
+        warmup_session(session, self._specs[name][1])
+        self._sessions[name] = session
+        self._mtimes[name] = mtime
+        self._last_checked[name] = time.monotonic()
+        logger.info("ONNX模型加载成功: %s (%s)", name, path)
+        return session
+
+    def _file_changed(self, name: str) -> bool:
+        try:
+            return os.path.getmtime(self.model_path(name)) != self._mtimes.get(name)
+        except OSError:
+            # 文件正在被替换时可能短暂不存在，继续使用当前会话
+            return False
+
+    def _is_stale(self, name: str) -> bool:
+        now = time.monotonic()
+        if now - self._last_checked.get(name, 0.0) < self._reload_check_interval:
+            return False
+        self._last_checked[name] = now
+        return self._file_changed(name)
+
+    def get(self, name: str) -> ort.InferenceSession:
+        """
+        获取模型会话（懒加载，文件变化时热重载）
+
+        Args:
+            name: 模型名称
+
+        Returns:
+            ONNX推理会话
+        """
+        session = self._sessions.get(name)
+        if session is not None and not self._is_stale(name):
+            return session
+
+        with self._lock:
+            session = self._sessions.get(name)
+            if session is not None and not self._file_changed(name):
+                return session
+            try:
+                return self._load(name)
+            except Exception as e:
+                if session is not None:
+                    # 重新加载失败时保留旧会话，避免服务中断
+                    logger.warning("模型重新加载失败，继续使用旧模型: %s: %s", name, e)
+                    return session
+                logger.error("加载模型失败: %s: %s", name, e)
+                raise
+
+    def preload(self, names: Optional[Iterable[str]] = None) -> None:
+        """在服务启动时加载并预热模型，缺失的模型留到首次使用时再加载"""
+        for name in names or self._specs.keys():
+            try:
+                self.get(name)
+            except Exception as e:
+                logger.warning("模型预加载失败: %s: %s", name, e)
+
+
+registry = ModelRegistry(MODEL_SPECS)
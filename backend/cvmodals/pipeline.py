@@ -0,0 +1,111 @@
+import asyncio
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+from cvmodals.eye_predict import detect_eyes
+from cvmodals.face_roi import FaceROITracker
+from cvmodals.frame_filter import SceneChangeFilter, frame_thumbnail
+from cvmodals.predict import pose_batcher, pose_input_size
+from cvmodals.preprocessing import (FACE_ROI_INPUT_SIZE, POSE_INPUT_SIZE, decode_frame,
+                                    preprocess_pose_frame)
+from cvmodals.worker_pool import inference_pool
+from metrics import metrics
+
+
+async def _timed(stage: str, awaitable):
+    with metrics.timer(stage):
+        return await awaitable
+
+
+def prepare_pose_input(image: np.ndarray,
+                       roi: Optional[Tuple[int, int, int, int]] = None) -> np.ndarray:
+    """
+    生成姿态模型输入：有人脸区域时只缩放裁剪图（更小的输入尺寸），否则缩放整帧
+    """
+    if roi is None:
+        return preprocess_pose_frame(image, pose_input_size(POSE_INPUT_SIZE))
+    x1, y1, x2, y2 = roi
+    return preprocess_pose_frame(image[y1:y2, x1:x2], pose_input_size(FACE_ROI_INPUT_SIZE))
+
+
+async def analyze_frame(image_data: bytes,
+                        scene_filter: Optional[SceneChangeFilter] = None,
+                        face_tracker: Optional[FaceROITracker] = None) -> Dict[str, Any]:
+    """
+    单次解码的组合分析流程
+
+    每帧只解码一次，由同一个解码结果分别生成 320x320 的姿态输入和
+    800x800 等比例填充的眼部输入；姿态推理经由微批处理调度器，
+    眼部检测同时在工作池中运行。
+
+    传入 scene_filter 时先用低分辨率缩略图判断画面是否变化，
+    未变化则直接返回上一次的结果（cached 为 True），跳过模型推理。
+
+    传入 face_tracker 时，姿态模型只处理由上一帧眼部检测框跟踪得到的
+    人脸区域，本帧的检测框再用于更新跟踪器。
+
+    Args:
+        image_data: 二进制图像数据
+        scene_filter: 会话的画面变化预过滤器
+        face_tracker: 会话的人脸区域跟踪器
+
+    Returns:
+        包含 position（头部姿态）、detections（眼部检测框）、image_size 与 cached 的字典
+    """
+    if scene_filter is not None:
+        thumbnail = await _timed('frame.thumbnail', inference_pool.run(frame_thumbnail, image_data))
+        cached = scene_filter.lookup(thumbnail)
+        if cached is not None:
+            metrics.inc('frames_cached')
+            return {**cached, 'cached': True}
+
+    metrics.inc('frames_analyzed')
+    image = await _timed('frame.decode', inference_pool.run(decode_frame, image_data))
+    roi = face_tracker.roi(image.shape) if face_tracker is not None else None
+    pose_input = await _timed('pose.preprocess', inference_pool.run(prepare_pose_input, image, roi))
+
+    # 两个分支的耗时包含排队等待（微批窗口 / 工作池），与模型内部的 session_run 对照可看出排队开销
+    position, eyes = await asyncio.gather(
+        _timed('pose.batched', pose_batcher.submit(pose_input)),
+        _timed('eye.detect', inference_pool.run(detect_eyes, image)),
+    )
+    if face_tracker is not None:
+        face_tracker.update(eyes['detections'])
+    result = {
+        'position': position,
+        'detections': eyes['detections'],
+        'image_size': eyes['image_size'],
+        'face_roi': list(roi) if roi is not None else None,
+    }
+    if scene_filter is not None:
+        scene_filter.store(thumbnail, result)
+    return {**result, 'cached': False}
+
+
+class LatestFrameSlot:
+    """
+    只保留最新一帧的单槽信箱
+
+    推理跟不上接收速度时，新到达的帧直接覆盖尚未处理的旧帧，
+    保证每次处理的都是最新画面，积压不会随时间增长。
+    """
+
+    def __init__(self):
+        self._frame: Optional[bytes] = None
+        self._event = asyncio.Event()
+        self.received = 0
+        self.skipped = 0
+
+    def put(self, frame: bytes) -> None:
+        if self._frame is not None:
+            self.skipped += 1
+        self._frame = frame
+        self.received += 1
+        self._event.set()
+
+    async def get(self) -> bytes:
+        await self._event.wait()
+        self._event.clear()
+        frame, self._frame = self._frame, None
+        return frame
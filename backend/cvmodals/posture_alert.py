@@ -0,0 +1,110 @@
+import os
+import time
+from typing import Dict, Optional
+
+# 姿态角度与 UserSetting 阈值字段的对应关系
+AXIS_THRESHOLDS = (('yaw', 'yall'), ('pitch', 'pitch'), ('roll', 'roll'))
+
+
+class PostureAlertEngine:
+    """
+    单个会话的头部姿态提醒状态机
+
+    用指数移动平均（EMA）平滑角度，每帧 O(1) 更新；
+    状态在 normal -> pending -> alerting 之间切换：
+    - 平滑后的角度超过阈值进入 pending，持续 min_duration 秒后触发提醒；
+    - 期间一旦回到阈值以内即回到 normal，短暂的偏头不会触发；
+    - alerting 状态下要回落到阈值的 release_ratio 倍以内才解除（滞回），
+      持续不良姿态每隔 repeat_interval 秒重复提醒一次。
+    """
+
+    NORMAL = 'normal'
+    PENDING = 'pending'
+    ALERTING = 'alerting'
+
+    def __init__(self,
+                 alpha: float = 0.3,
+                 min_duration: float = 3.0,
+                 release_ratio: float = 0.8,
+                 repeat_interval: float = 60.0):
+        """
+        Args:
+            alpha: EMA 平滑系数，越大越跟随最新一帧
+            min_duration: 持续超限多少秒后触发提醒
+            release_ratio: 解除提醒所需回落到的阈值比例
+            repeat_interval: 持续超限时重复提醒的间隔（秒）
+        """
+        self.alpha = alpha
+        self.min_duration = min_duration
+        self.release_ratio = release_ratio
+        self.repeat_interval = repeat_interval
+        self.smoothed: Optional[Dict[str, float]] = None
+        self.state = self.NORMAL
+        self._since = 0.0
+        self._last_alert = 0.0
+
+    def _severity(self, thresholds: Dict[str, float]) -> float:
+        """平滑角度相对阈值的最大比例，>1 表示超限"""
+        ratios = [
+            abs(self.smoothed[axis]) / thresholds[key]
+            for axis, key in AXIS_THRESHOLDS
+            if thresholds.get(key)
+        ]
+        return max(ratios) if ratios else 0.0
+
+    def update(self, position: Dict[str, float],
+               thresholds: Dict[str, float],
+               now: Optional[float] = None) -> bool:
+        """
+        输入一帧姿态并推进状态机
+
+        Args:
+            position: 当前帧的 yaw/pitch/roll
+            thresholds: 用户设置的 yall/pitch/roll 阈值
+            now: 帧时间（单调时钟秒），默认取当前时间
+
+        Returns:
+            本帧是否触发了一次提醒
+        """
+        now = time.monotonic() if now is None else now
+        if self.smoothed is None:
+            self.smoothed = {axis: position[axis] for axis, _ in AXIS_THRESHOLDS}
+        else:
+            for axis, _ in AXIS_THRESHOLDS:
+                self.smoothed[axis] += self.alpha * (position[axis] - self.smoothed[axis])
+
+        severity = self._severity(thresholds)
+        if self.state == self.NORMAL:
+            if severity > 1:
+                self.state, self._since = self.PENDING, now
+        elif self.state == self.PENDING:
+            if severity <= 1:
+                self.state = self.NORMAL
+            elif now - self._since >= self.min_duration:
+                self.state, self._last_alert = self.ALERTING, now
+                return True
+        elif self.state == self.ALERTING:
+            if severity < self.release_ratio:
+                self.state = self.NORMAL
+            elif now - self._last_alert >= self.repeat_interval:
+                self._last_alert = now
+                return True
+        return False
+
+    def snapshot(self) -> dict:
+        return {
+            "state": self.state,
+            "smoothed": {
+                axis: round(value, 2) for axis, value in (self.smoothed or {}).items()
+            },
+        }
+
+
+def create_posture_engine() -> PostureAlertEngine:
+    """按环境变量配置创建状态机"""
+    return PostureAlertEngine(
+        alpha=float(os.environ.get('HUC_ALERT_EMA_ALPHA', 0.3)),
+        min_duration=float(os.environ.get('HUC_ALERT_MIN_DURATION', 3.0)),
+        release_ratio=float(os.environ.get('HUC_ALERT_RELEASE_RATIO', 0.8)),
+        repeat_interval=float(os.environ.get('HUC_ALERT_REPEAT_INTERVAL', 60.0)),
+    )
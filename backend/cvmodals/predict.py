@@ -1,150 +1,111 @@
+import logging
 import os
 import numpy as np
-from PIL import Image
-import io
 import onnxruntime as ort
-import torch
-import torch.nn as nn
+from typing import List, Tuple
+from cvmodals.batching import MicroBatcher
+from cvmodals.model_registry import registry
+from cvmodals.worker_pool import inference_pool
+from metrics import metrics
+from log_config import DebugSampler
 
-# 加载模型
-def load_model(model_path: str) -> ort.InferenceSession:
-    """
-    加载ONNX模型
-    
-    Args:
-        model_path: .onnx模型文件的路径
-    
-    Returns:
-        ONNX推理会话
-    """
-    try:
-        # 创建ONNX运行时会话
-        session = ort.InferenceSession(model_path)
-        print("ONNX模型加载成功")
-        return session
-    except Exception as e:
-        print(f"加载模型失败: {str(e)}")
-        raise
+logger = logging.getLogger(__name__)
+_debug_sample = DebugSampler(logger)
+
+# 各角度轴的分类配置：类别数、每类步长（度）、起始偏移（度）
+POSE_AXES = [
+    ('yaw', 19, 10, -93),
+    ('pitch', 38, 5, -93),
+    ('roll', 38, 5, -93),
+]
+
+# 预先计算每个分类区间对应的角度值；softmax 概率和为1，
+# 因此 sum(p * idx) * step + offset == sum(p * (idx * step + offset))
+BIN_DEGREES = [
+    np.arange(num_classes, dtype=np.float32) * step + offset
+    for _, num_classes, step, offset in POSE_AXES
+]
 
-# 预处理图像
-def preprocess_image(image_data: bytes) -> np.ndarray:
+def softmax(logits: np.ndarray) -> np.ndarray:
+    """按最后一个维度计算数值稳定的softmax"""
+    exp = np.exp(logits - logits.max(axis=-1, keepdims=True))
+    return exp / exp.sum(axis=-1, keepdims=True)
+
+def decode_pose(predictions: List[np.ndarray]) -> np.ndarray:
     """
-    预处理图像数据
-    
+    把模型输出的分类logits解码为角度
+
     Args:
-        image_data: 二进制图像数据
-    
+        predictions: 模型输出 [yaw, pitch, roll]，形状分别为 (N, 类别数)
+
     Returns:
-        预处理后的图像数组
+        形状为 (N, 3) 的 [yaw, pitch, roll] 角度数组
     """
-    # 将二进制数据转换为PIL图像
-    image = Image.open(io.BytesIO(image_data))
-    
-    # 调整图像大小到320x320
-    image = image.resize((320, 320))
-    
-    # 转换为numpy数组并归一化
-    image_array = np.array(image) / 255.0
-    
-    # 转换为CHW格式并添加批次维度
-    image_array = np.transpose(image_array, (2, 0, 1))  # HWC -> CHW
-    image_array = np.expand_dims(image_array, axis=0)   # 添加批次维度
-    
-    # 确保数据类型和形状正确
-    image_array = image_array.astype(np.float32)
-    
-    # 打印调试信息
-    print(f"预处理后的图像形状: {image_array.shape}")
-    print(f"预处理后的图像类型: {image_array.dtype}")
-    
-    return image_array
+    return np.stack([
+        softmax(logits.astype(np.float32, copy=False)) @ bin_degrees
+        for logits, bin_degrees in zip(predictions, BIN_DEGREES)
+    ], axis=1)
 
-# 预测姿态
-def predict_pose(session: ort.InferenceSession, image_array: np.ndarray) -> dict:
+# 批量预测姿态
+def predict_pose_batch(session: ort.InferenceSession, image_array: np.ndarray) -> List[dict]:
     """
     Args:
         session: ONNX推理会话
-        image_array: 预处理后的图像数组
+        image_array: 预处理后的图像数组，形状 (N, 3, H, W)
     
     Returns:
-        包含预测结果的字典
+        每一帧对应一个预测结果字典的列表
     """
     # 获取输入名称
     input_name = session.get_inputs()[0].name
     input_shape = session.get_inputs()[0].shape
-    input_type = session.get_inputs()[0].type
-    print(f"模型输入名称: {input_name}")
-    print(f"模型输入形状: {input_shape}")
-    print(f"模型输入类型: {input_type}")
-    
-    # 运行推理
-    predictions = session.run(None, {input_name: image_array})
-    
-    # 处理预测结果
-    pred_ypr = []
-    class_info = {
-        'yaw': {'num_classes': 19, 'step': 10, 'offset': -93},
-        'pitch': {'num_classes': 38, 'step': 5, 'offset': -93},
-        'roll': {'num_classes': 38, 'step': 5, 'offset': -93}
-    }
-    axes = ['yaw', 'pitch', 'roll']
-    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-    
-    for axis in axes:
-        # 将numpy数组转换为PyTorch张量
-        pred_axis = torch.from_numpy(predictions[axes.index(axis)]).to(device)
-        print(f"{axis}预测形状: {pred_axis.shape}")
-        
-        # 应用softmax
-        predicted = nn.Softmax(dim=1)(pred_axis)
-        
-        # 计算角度
-        idx_tensor = torch.tensor([idx for idx in range(class_info[axis]['num_classes'])], device=device)
-        step = class_info[axis]['step']
-        offset = class_info[axis]['offset']
-        degrees = torch.sum(predicted * idx_tensor, 1).to(device) * step + offset
-        pred_ypr.append(degrees.cpu().numpy()[0])
-    
-    print(f"预测角度: {pred_ypr}")
+    if _debug_sample():
+        logger.debug("模型输入: %s %s %s, 批次 %s", input_name, input_shape,
+                     session.get_inputs()[0].type, image_array.shape)
+    
+    # 运行推理（模型导出时批次维度固定的情况下逐帧运行）
+    batch_dim = input_shape[0]
+    if isinstance(batch_dim, int) and batch_dim != image_array.shape[0]:
+        with metrics.timer('pose.session_run'):
+            per_frame = [session.run(None, {input_name: image_array[i:i + 1]}) for i in range(image_array.shape[0])]
+        predictions = [np.concatenate(outputs, axis=0) for outputs in zip(*per_frame)]
+    else:
+        with metrics.timer('pose.session_run'):
+            predictions = session.run(None, {input_name: image_array})
+    
+    # 解码为角度，形状 (N, 3)
+    with metrics.timer('pose.softmax_decode'):
+        pred_ypr = decode_pose(predictions)
+    if _debug_sample():
+        logger.debug("预测角度: %s", pred_ypr)
     
     # 返回结果
-    return {
-        'yaw': float(pred_ypr[0]),
-        'pitch': float(pred_ypr[1]),
-        'roll': float(pred_ypr[2])
-    }
+    return [{
+        'yaw': float(yaw),
+        'pitch': float(pitch),
+        'roll': float(roll)
+    } for yaw, pitch, roll in pred_ypr.tolist()]
 
-# 组合函数
-def process_image(image_data: bytes) -> dict:
+def pose_input_size(default: Tuple[int, int]) -> Tuple[int, int]:
     """
-    完整的图像处理流程
-    
-    Args:
-        model_path: .onnx模型文件的路径
-        image_data: 二进制图像数据
-    
-    Returns:
-        包含预测结果的字典
+    姿态模型实际接受的输入尺寸 (H, W)
+
+    模型以固定空间尺寸导出时只能使用该尺寸，动态尺寸时使用 default。
     """
-    position_Path = os.path.join(os.path.dirname(__file__),  'resnet34.onnx')
-    # 加载模型
-    print("loading ONNX model")
-    positionSession = load_model(position_Path)
-    
-    # 预处理图像
-    image_array = preprocess_image(image_data)
-    
-    # 预测姿态
-    posePredictions = predict_pose(positionSession, image_array)
-    # return {
-    #     'yaw': float(pred_ypr[0]),
-    #     'pitch': float(pred_ypr[1]),
-    #     'roll': float(pred_ypr[2])
-    # }
+    shape = registry.get('pose').get_inputs()[0].shape
+    height, width = shape[2], shape[3]
+    if isinstance(height, int) and isinstance(width, int):
+        return height, width
+    return default
 
-    # yaw_bin = predictions['head_yaw'] - torch.max(predictions['head_yaw'], dim=1, keepdim=True).values
-    # pitch_bin = predictions['head_pitch'] - torch.max(predictions['head_pitch'], dim=1, keepdim=True).values
-    # roll_bin = predictions['head_roll'] - torch.max(predictions['head_roll'], dim=1, keepdim=True).values
-    # print(predictions)
-    
-    return posePredictions
\ No newline at end of file
+def run_pose_batch(image_array: np.ndarray) -> List[dict]:
+    """使用注册表中的姿态模型做批量推理（模块级函数，可被进程池序列化）"""
+    return predict_pose_batch(registry.get('pose'), image_array)
+
+# 姿态模型的微批处理调度器，并发请求在此合并为一次批量推理
+pose_batcher = MicroBatcher(
+    run_batch=run_pose_batch,
+    max_batch_size=int(os.environ.get('HUC_BATCH_MAX_SIZE', 8)),
+    max_wait_ms=float(os.environ.get('HUC_BATCH_MAX_WAIT_MS', 5)),
+    pool=inference_pool,
+)
@@ -0,0 +1,136 @@
+import threading
+from functools import lru_cache
+from typing import Optional, Tuple
+
+import cv2
+import numpy as np
+
+# 模型输入尺寸 (H, W)
+POSE_INPUT_SIZE = (320, 320)
+EYE_INPUT_SIZE = (800, 800)
+# 人脸裁剪图送入姿态模型时的尺寸（模型支持动态尺寸时生效）
+FACE_ROI_INPUT_SIZE = (224, 224)
+
+_SCALE = np.float32(1.0 / 255.0)
+_local = threading.local()
+
+
+def reusable_buffer(name: str, shape: Tuple[int, ...], dtype=np.float32) -> np.ndarray:
+    """
+    获取当前线程私有的预分配缓冲区
+
+    同一线程、同一名称和形状的调用返回同一块内存，内容在下一次
+    同名调用时会被覆盖，因此只能用于在本线程内同步消费的数据。
+    """
+    buffers = getattr(_local, 'buffers', None)
+    if buffers is None:
+        buffers = _local.buffers = {}
+    key = (name, shape, np.dtype(dtype))
+    buffer = buffers.get(key)
+    if buffer is None:
+        buffer = buffers[key] = np.zeros(shape, dtype=dtype)
+    return buffer
+
+
+@lru_cache(maxsize=64)
+def letterbox_geometry(src_h: int, src_w: int,
+                       target_h: int, target_w: int) -> Tuple[int, int, int, int]:
+    """
+    计算等比例缩放加居中填充的几何参数（按输入分辨率缓存）
+
+    Returns:
+        (new_h, new_w, top, left)
+    """
+    scale = min(target_h / src_h, target_w / src_w)
+    new_w = int(src_w * scale)
+    new_h = int(src_h * scale)
+    top = (target_h - new_h) // 2
+    left = (target_w - new_w) // 2
+    return new_h, new_w, top, left
+
+
+def normalize_into(image: np.ndarray, out: np.ndarray, bgr: bool = False) -> np.ndarray:
+    """
+    把 HWC uint8 图像归一化到 [0, 1] 并直接写入 CHW float32 目标数组
+
+    Args:
+        image: (H, W, 3) uint8 图像
+        out: (3, H, W) float32 目标数组（可以是更大数组的视图）
+        bgr: 输入为BGR时在写入过程中顺便转换为RGB
+    """
+    if bgr:
+        image = image[:, :, ::-1]
+    np.multiply(image.transpose(2, 0, 1), _SCALE, out=out, dtype=np.float32)
+    return out
+
+
+def decode_frame(image_data: bytes) -> np.ndarray:
+    """
+    把编码后的图像解码为 (H, W, 3) BGR 数组，整个分析流程只解码这一次
+
+    Raises:
+        ValueError: 图像数据无法解码
+    """
+    image = cv2.imdecode(np.frombuffer(image_data, np.uint8), cv2.IMREAD_COLOR)
+    if image is None:
+        raise ValueError("无法解码图片数据")
+    return image
+
+
+def preprocess_pose_frame(image: np.ndarray,
+                          size: Tuple[int, int] = POSE_INPUT_SIZE,
+                          out: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    从已解码的BGR图像生成姿态模型输入
+
+    Args:
+        image: (H, W, 3) BGR 图像
+        size: 目标尺寸 (H, W)
+        out: 可选的 (1, 3, H, W) float32 目标数组，None 时新分配
+
+    Returns:
+        形状为 (1, 3, H, W) 的 float32 RGB 数组
+    """
+    height, width = size
+    resized = cv2.resize(
+        image, (width, height),
+        dst=reusable_buffer('pose_resized', (height, width, 3), np.uint8),
+        interpolation=cv2.INTER_AREA,
+    )
+    if out is None:
+        out = np.empty((1, 3, height, width), dtype=np.float32)
+    normalize_into(resized, out[0], bgr=True)
+    return out
+
+
+def preprocess_letterbox(image: np.ndarray,
+                         size: Tuple[int, int] = EYE_INPUT_SIZE,
+                         reuse_buffer: bool = False) -> np.ndarray:
+    """
+    把BGR图像等比例缩放、居中填充并归一化为 (1, 3, H, W) 的RGB输入
+
+    缩放结果直接写入目标数组的有效区域，填充区域保持为0。
+
+    Args:
+        image: OpenCV 解码得到的 (H, W, 3) BGR 图像
+        size: 目标尺寸 (H, W)
+        reuse_buffer: 为True时写入线程私有缓冲区（按缩放几何区分，填充区域始终为0），
+            返回值在本线程下一次调用前有效
+
+    Returns:
+        形状为 (1, 3, H, W) 的 float32 数组
+    """
+    target_h, target_w = size
+    geometry = letterbox_geometry(image.shape[0], image.shape[1], target_h, target_w)
+    new_h, new_w, top, left = geometry
+    shape = (1, 3, target_h, target_w)
+    if reuse_buffer:
+        out = reusable_buffer(f'letterbox_{geometry}', shape)
+    else:
+        out = np.zeros(shape, dtype=np.float32)
+    resized = cv2.resize(
+        image, (new_w, new_h),
+        dst=reusable_buffer('letterbox_resized', (new_h, new_w, 3), np.uint8),
+    )
+    normalize_into(resized, out[0, :, top:top + new_h, left:left + new_w], bgr=True)
+    return out
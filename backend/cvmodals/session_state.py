@@ -0,0 +1,41 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Hashable
+
+
+class SessionStore:
+    """
+    按会话保存流式状态的有界存储
+
+    每个会话（HTTP 的 session_id 或一个 WebSocket 连接）拥有独立的状态对象，
+    首次访问时由 factory 创建；超过 max_sessions 时淘汰最久未使用的会话，
+    避免客户端不结束会话时状态无限增长。
+
+    事件循环中的帧处理调用 get()，而 /session/end 等同步接口在线程池中调用 pop()，
+    因此所有访问都持有同一把锁（只保护字典操作，不包括对状态对象本身的使用）。
+    """
+
+    def __init__(self, factory: Callable[[], Any], max_sessions: int = 64):
+        self._factory = factory
+        self._max_sessions = max_sessions
+        self._states: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Any:
+        with self._lock:
+            state = self._states.get(key)
+            if state is None:
+                state = self._states[key] = self._factory()
+                while len(self._states) > self._max_sessions:
+                    self._states.popitem(last=False)
+            else:
+                self._states.move_to_end(key)
+            return state
+
+    def pop(self, key: Hashable) -> None:
+        with self._lock:
+            self._states.pop(key, None)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._states)
@@ -0,0 +1,92 @@
+import asyncio
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import partial
+from typing import Any, Callable, Optional
+
+
+class QueueFullError(Exception):
+    """推理队列已满，当前帧被丢弃"""
+
+
+class InferencePool:
+    """
+    有界推理工作池
+
+    把解码、预处理和模型推理等阻塞操作放到线程池或进程池中执行，
+    避免占用事件循环；同时限制在途帧数量，队列满时直接丢帧，
+    让其他轻量接口始终保持响应。
+    """
+
+    def __init__(self,
+                 max_workers: Optional[int] = None,
+                 max_pending: int = 16,
+                 use_processes: bool = False):
+        """
+        Args:
+            max_workers: 工作线程/进程数，None 表示按CPU核数决定
+            max_pending: 允许同时处理（含排队）的最大帧数
+            use_processes: True 时使用进程池，否则使用线程池
+        """
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_pending = max(1, max_pending)
+        self.use_processes = use_processes
+        self._executor: Optional[Executor] = None
+        # 只在事件循环线程中修改，无需加锁
+        self._in_flight = 0
+        self._accepted = 0
+        self._dropped = 0
+
+    @property
+    def executor(self) -> Executor:
+        if self._executor is None:
+            if self.use_processes:
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix="inference"
+                )
+        return self._executor
+
+    @contextmanager
+    def slot(self):
+        """
+        占用一个在途帧名额，名额用尽时抛出 QueueFullError
+        """
+        if self._in_flight >= self.max_pending:
+            self._dropped += 1
+            raise QueueFullError(f"推理队列已满（{self.max_pending}），帧已丢弃")
+        self._in_flight += 1
+        self._accepted += 1
+        try:
+            yield
+        finally:
+            self._in_flight -= 1
+
+    async def run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """在工作池中执行阻塞函数并等待结果"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, partial(fn, *args))
+
+    def stats(self) -> dict:
+        return {
+            "pool": "process" if self.use_processes else "thread",
+            "max_workers": self.max_workers,
+            "max_pending": self.max_pending,
+            "in_flight": self._in_flight,
+            "accepted": self._accepted,
+            "dropped": self._dropped,
+        }
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+inference_pool = InferencePool(
+    max_workers=int(os.environ.get('HUC_INFERENCE_WORKERS', 0)) or None,
+    max_pending=int(os.environ.get('HUC_INFERENCE_MAX_PENDING', 16)),
+    use_processes=os.environ.get('HUC_INFERENCE_POOL', 'thread').lower() == 'process',
+)
@@ -1,13 +1,19 @@
 from fastapi import  HTTPException
 from sqlalchemy.orm import Session
-from sqlalchemy import Float, func, case, extract
-from datetime import date, datetime
-from typing import Optional, List, Dict
+from sqlalchemy import func
+import heapq
+from datetime import date, datetime, timedelta
+from itertools import groupby
+from operator import itemgetter
+from typing import Iterator, Optional, List, Dict, Tuple
 from pydantic import BaseModel
-import pandas as pd
 
 # ---------- 数据库基础配置 ----------
-from dataStorage.modals import AlertEvent, PostureMetric, ScreenSession, UserSetting
+from dataStorage.modals import AlertEvent, PostureDaily, PostureHourly, ScreenSession, ScreenTimeHourly, UserSetting
+from dataStorage.rollups import HOUR_FORMAT, open_session_seconds
+from dataStorage.report_cache import report_cache
+from dataStorage.settings_cache import settings_cache
+from metrics import metrics
 
 class ScreenSessionResponse(BaseModel):
     date: date
@@ -17,114 +23,229 @@ class PostureMetricResponse(BaseModel):
     timestamp: datetime
     pitch: float
     yaw: float
-    yoll:float
+    roll: float
 
 class AlertCorrelationResponse(BaseModel):
     date: date
     total_duration_hours: float
     alert_count: int
 
+def day_range(start_date: date, end_date: date) -> Tuple[datetime, datetime]:
+    """把闭区间日期 [start_date, end_date] 转换为半开的时间区间 [start, end)，便于使用时间列索引"""
+    return (datetime.combine(start_date, datetime.min.time()),
+            datetime.combine(end_date + timedelta(days=1), datetime.min.time()))
+
+def _parse_week_bucket(bucket: str) -> datetime:
+    """周桶形如 '2025-15'，取该周的星期一"""
+    return datetime.strptime(bucket + '-1', '%Y-%W-%w')
+
 class DataAccess:
     @staticmethod
-    def get_screen_sessions(
+    @metrics.timed('db.get_daily_report')
+    def get_daily_report(
         db: Session,
         start_date: date,
         end_date: date
-    ) -> List[Dict]:
-        """获取屏幕使用时间分布"""
+    ) -> Dict:
+        """获取时间范围内的使用时长、会话数与各类提醒次数"""
+        start, end = day_range(start_date, end_date)
+        lower, upper = start.strftime(HOUR_FORMAT), end.strftime(HOUR_FORMAT)
+
+        # 使用时长统计（读取每小时汇总表，并补上进行中的会话）
+        total_duration = db.query(
+            func.sum(ScreenTimeHourly.seconds)
+        ).filter(
+            ScreenTimeHourly.bucket >= lower,
+            ScreenTimeHourly.bucket < upper
+        ).scalar() or 0
+        total_duration += sum(seconds for bucket, seconds in open_session_seconds(db).items()
+                              if lower <= bucket < upper)
+        sessions = db.query(func.count(ScreenSession.id)).filter(
+            ScreenSession.start_time >= start,
+            ScreenSession.start_time < end
+        ).scalar()
+
+        # 提醒统计
+        alerts = db.query(
+            AlertEvent.alert_type,
+            func.count().label('count')
+        ).filter(
+            AlertEvent.trigger_time >= start,
+            AlertEvent.trigger_time < end
+        ).group_by(AlertEvent.alert_type).all()
+
+        return {
+            "total_usage_seconds": int(total_duration or 0),
+            "sessions": sessions or 0,
+            "alerts": {alert_type: count for alert_type, count in alerts}
+        }
+
+    @staticmethod
+    def iter_screen_sessions(
+        db: Session,
+        start_date: date,
+        end_date: date,
+        chunk_size: int = 1000
+    ) -> Iterator[Dict]:
+        """
+        按时间顺序逐行产出屏幕使用时间分布，不在内存中物化全部结果
+
+        已结束会话读取每小时汇总表，进行中的会话按小时拆分到当前时间后按桶合并。
+        """
+        start, end = day_range(start_date, end_date)
+        lower, upper = start.strftime(HOUR_FORMAT), end.strftime(HOUR_FORMAT)
         results = db.query(
-            func.date(ScreenSession.start_time).label("date"),
-            extract('hour', ScreenSession.start_time).label("hour"),
-            func.sum(
-                func.julianday(ScreenSession.end_time) - 
-                func.julianday(ScreenSession.start_time)
-            ).cast(Float).label("duration_hours")
+            ScreenTimeHourly.bucket,
+            ScreenTimeHourly.seconds
         ).filter(
-            func.date(ScreenSession.start_time) >= start_date,
-            func.date(ScreenSession.start_time) <= end_date
-        ).group_by("date", "hour").all()
+            ScreenTimeHourly.bucket >= lower,
+            ScreenTimeHourly.bucket < upper
+        ).order_by(ScreenTimeHourly.bucket).yield_per(chunk_size)
+        open_parts = sorted((bucket, seconds) for bucket, seconds in open_session_seconds(db).items()
+                            if lower <= bucket < upper)
 
-        return [{"date": r.date, "hour": r.hour, "duration_hours": r.duration_hours} 
-                for r in results]
+        rows = ((bucket, seconds) for bucket, seconds in results)
+        for bucket, parts in groupby(heapq.merge(rows, open_parts), key=itemgetter(0)):
+            seconds = sum(part for _, part in parts)
+            yield {"date": bucket[:10], "hour": int(bucket[11:13]), "duration_hours": seconds / 3600}
 
     @staticmethod
-    def get_posture_metrics(
+    @metrics.timed('db.get_screen_sessions')
+    def get_screen_sessions(
         db: Session,
-        time_bucket: str
+        start_date: date,
+        end_date: date
     ) -> List[Dict]:
-        """获取姿态指标聚合数据（修复版）"""
-        time_expr_map = {
-        'H': func.strftime('%Y-%m-%d %H:00:00', PostureMetric.timestamp),
-        'D': func.strftime('%Y-%m-%d 00:00:00', PostureMetric.timestamp),
-        'W': func.strftime('%Y-%W', PostureMetric.timestamp),
-        'M': func.strftime('%Y-%m-01', PostureMetric.timestamp)
-         }
+        """获取屏幕使用时间分布（读取每小时汇总表）"""
+        return list(DataAccess.iter_screen_sessions(db, start_date, end_date))
+
+    @staticmethod
+    def iter_posture_metrics(
+        db: Session,
+        time_bucket: str,
+        chunk_size: int = 1000
+    ) -> Iterator[Dict]:
+        """
+        按时间顺序逐行产出姿态指标聚合数据（读取小时 / 天汇总表）
+
+        Raises:
+            HTTPException: 不支持的时间分桶（调用时立即检查，而不是在迭代时）
+        """
+        # 时间桶 -> (汇总表, 分组表达式, 分组结果的解析函数)
+        # 小时 / 天 / 月桶本身就是 ISO 格式，用 fromisoformat 解析（远快于 strptime）
+        rollup_map = {
+            'H': (PostureHourly, PostureHourly.bucket, datetime.fromisoformat),
+            'D': (PostureDaily, PostureDaily.bucket, datetime.fromisoformat),
+            'W': (PostureDaily, func.strftime('%Y-%W', PostureDaily.bucket), _parse_week_bucket),
+            'M': (PostureDaily, func.strftime('%Y-%m-01', PostureDaily.bucket), datetime.fromisoformat)
+        }
     
         try:
-            time_expr = time_expr_map[time_bucket]
+            model, bucket_expr, parse_bucket = rollup_map[time_bucket]
         except KeyError:
             raise HTTPException(status_code=400, detail="Unsupported time bucket")
 
-        # 执行聚合查询
+        # 汇总表中保存的是和与计数，均值在合并后再计算
         query = db.query(
-            time_expr.label('time_bucket'),
-            func.avg(PostureMetric.pitch).label('pitch'),
-            func.avg(PostureMetric.yaw).label('yaw'),
-            func.avg(PostureMetric.roll).label('roll')
-        ).group_by('time_bucket')
+            bucket_expr.label('time_bucket'),
+            func.sum(model.count).label('count'),
+            func.sum(model.pitch_sum).label('pitch'),
+            func.sum(model.yaw_sum).label('yaw'),
+            func.sum(model.roll_sum).label('roll')
+        ).group_by('time_bucket').order_by('time_bucket')
 
-        try:
-            results = query.all()
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+        return DataAccess._format_posture_rows(query.yield_per(chunk_size), parse_bucket)
 
-        # 结果格式化
-        formatted_results = []
-        for r in results:
+    @staticmethod
+    def _format_posture_rows(rows, parse_bucket) -> Iterator[Dict]:
+        for bucket_key, count, pitch, yaw, roll in rows:
+            if not count:
+                continue
             try:
-                if time_bucket == 'W':
-                    dt = datetime.strptime(r.time_bucket + '-1', "%Y-%W-%w")
-                else:
-                    dt = datetime.strptime(r.time_bucket, time_expr_map[time_bucket].compile().string)
-                
-                formatted_results.append({
-                    "timestamp": dt.isoformat(),
-                    "pitch": round(float(r.pitch), 2) if r.pitch is not None else None,
-                    "yaw": round(float(r.yaw), 2) if r.yaw is not None else None,
-                    "roll": round(float(r.roll), 2) if r.roll is not None else None
-                })
-            except Exception as e:
-                # raise HTTPException(e)
+                dt = parse_bucket(bucket_key)
+            except (TypeError, ValueError):
                 continue
 
-        return formatted_results
+            yield {
+                "timestamp": dt.isoformat(),
+                "pitch": round(pitch / count, 2),
+                "yaw": round(yaw / count, 2),
+                "roll": round(roll / count, 2)
+            }
+
+    @staticmethod
+    @metrics.timed('db.get_posture_metrics')
+    def get_posture_metrics(
+        db: Session,
+        time_bucket: str
+    ) -> List[Dict]:
+        """获取姿态指标聚合数据（读取小时 / 天汇总表）"""
+        try:
+            return list(DataAccess.iter_posture_metrics(db, time_bucket))
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
 
     
     @staticmethod
+    @metrics.timed('db.get_alert_correlation')
     def get_alert_correlation(db: Session) -> List[Dict]:
-        """获取提醒与使用时长的关联数据"""
-        results = db.query(
-            func.date(ScreenSession.start_time).label("date"),
-            func.sum(
-                func.julianday(ScreenSession.end_time) -
-                func.julianday(ScreenSession.start_time)
-            ).cast(Float).label("total_duration_hours"),
-            func.count(AlertEvent.id).label("alert_count")
-        ).outerjoin(
-            AlertEvent,
-            func.date(ScreenSession.start_time) == func.date(AlertEvent.trigger_time)
-        ).group_by("date").all()
+        """
+        获取提醒与使用时长的关联数据
+
+        使用时长（小时汇总表）与提醒次数（alert_events）分别按天聚合后再按日期合并，
+        避免会话与提醒按天做连接时的笛卡尔积放大时长。
+
+        Returns:
+            按日期排序的 date/total_duration_hours/alert_count 列表
+        """
+        day = func.substr(ScreenTimeHourly.bucket, 1, 10)
+        usage = dict(db.query(day, func.sum(ScreenTimeHourly.seconds)).group_by(day).all())
+        for bucket, seconds in open_session_seconds(db).items():
+            usage[bucket[:10]] = (usage.get(bucket[:10]) or 0.0) + seconds
+
+        alert_day = func.date(AlertEvent.trigger_time)
+        alerts = dict(db.query(alert_day, func.count(AlertEvent.id)).group_by(alert_day).all())
 
         return [{
-            "date": r.date,
-            "total_duration_hours": r.total_duration_hours * 24,  # 转换天数为小时
-            "alert_count": r.alert_count
-        } for r in results]
+            "date": day_key,
+            "total_duration_hours": (usage.get(day_key) or 0.0) / 3600,
+            "alert_count": alerts.get(day_key, 0)
+        } for day_key in sorted(usage.keys() | alerts.keys())]
+
+
+    @staticmethod
+    def get_user_settings(db: Session) -> Optional[Dict]:
+        """获取用户设置（优先读取进程内缓存），尚未创建时返回 None"""
+        return settings_cache.get(db)
+
+    @staticmethod
+    def get_thresholds(db: Session) -> Dict[str, float]:
+        """获取用户设置的 yall/pitch/roll/eyeWidth 阈值"""
+        settings_cache.get(db)
+        return settings_cache.thresholds()
 
 
 class DataUpdate:
     @staticmethod
+    @metrics.timed('db.add_alert_event')
+    def add_alert_event(db: Session, alert_type: str) -> int:
+        """
+        记录一次提醒事件
+
+        Returns:
+            新事件的 id
+        """
+        event = AlertEvent(alert_type=alert_type, trigger_time=datetime.now())
+        db.add(event)
+        db.commit()
+        report_cache.touch('alerts')
+        return event.id
+
+    @staticmethod
+    @metrics.timed('db.updateSettings')
     def updateSettings(db:Session,data:dict):
         try:
         # 检查是否存在现有记录
@@ -143,6 +264,7 @@ class DataUpdate:
                         )
                 db.commit()
                 db.refresh(existing_setting)
+                settings_cache.set(existing_setting)
                 return existing_setting
             else:
                 # 创建新记录
@@ -158,6 +280,7 @@ class DataUpdate:
                 db.add(new_setting)
                 db.commit()
                 db.refresh(new_setting)
+                settings_cache.set(new_setting)
                 return new_setting 
         except Exception as e:
             db.rollback()
@@ -0,0 +1,76 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from typing import AsyncIterator, Callable, Iterable, List, Optional, TypeVar
+
+from database import SessionLocal
+
+T = TypeVar('T')
+
+# 数据库访问专用线程池，与推理线程池及事件循环默认线程池相互隔离，
+# 报表查询再慢也不会占用推理所需的线程。
+# 首次使用时创建，shutdown 后置空，下次使用（如测试中重复启动应用）时重新创建
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=int(os.environ.get('HUC_DB_WORKERS', 4)),
+            thread_name_prefix='db',
+        )
+    return _executor
+
+
+async def run_db(fn: Callable[..., T], *args) -> T:
+    """
+    在数据库线程池中以独立会话执行 fn(db, *args)，不阻塞事件循环
+
+    用法: data = await run_db(DataAccess.get_alert_correlation)
+
+    Args:
+        fn: 第一个参数为数据库会话的同步函数，如 DataAccess / DataUpdate 的方法
+        *args: 传给 fn 的其余参数
+
+    Returns:
+        fn 的返回值
+    """
+    def call():
+        with SessionLocal() as db:
+            return fn(db, *args)
+
+    return await asyncio.get_running_loop().run_in_executor(_get_executor(), call)
+
+
+async def stream_db(fn: Callable[..., Iterable[T]], *args, chunk_size: int = 500) -> AsyncIterator[List[T]]:
+    """
+    在数据库线程池中迭代 fn(db, *args) 的结果，按块异步产出，用于流式响应
+
+    会话在整个迭代期间保持打开，每次只在内存中保留一块结果。
+
+    Args:
+        fn: 第一个参数为数据库会话、返回可迭代对象的同步函数
+        *args: 传给 fn 的其余参数
+        chunk_size: 每块的行数
+    """
+    loop = asyncio.get_running_loop()
+    executor = _get_executor()
+    db = SessionLocal()
+    try:
+        rows = await loop.run_in_executor(executor, lambda: iter(fn(db, *args)))
+        while True:
+            chunk = await loop.run_in_executor(executor, lambda: list(islice(rows, chunk_size)))
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        await loop.run_in_executor(executor, db.close)
+
+
+def shutdown_db_executor() -> None:
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=True)
+        _executor = None
@@ -0,0 +1,132 @@
+import logging
+import queue
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from sqlalchemy.engine import Engine
+
+from dataStorage.modals import PostureMetric
+from dataStorage.report_cache import report_cache
+from metrics import metrics
+from dataStorage.rollups import add_posture_samples
+
+logger = logging.getLogger(__name__)
+
+
+class PostureMetricWriter:
+    """
+    姿态指标的后台批量写入器
+
+    推理路径只把样本放入内存中的有界队列（不等待SQLite提交），
+    后台线程在攒够 batch_size 条或距上次写入超过 flush_interval 秒时，
+    用一次 executemany 事务批量写入 posture_metrics，并在同一事务中
+    增量更新小时 / 天汇总表。
+    队列满时丢弃新样本并计数，保证推理永远不会被数据库阻塞。
+    """
+
+    def __init__(self,
+                 engine: Engine,
+                 batch_size: int = 200,
+                 flush_interval: float = 2.0,
+                 max_queue: int = 10000):
+        """
+        Args:
+            engine: 数据库引擎
+            batch_size: 单次事务写入的最大行数
+            flush_interval: 最长写入间隔（秒）
+            max_queue: 内存队列的最大长度
+        """
+        self._engine = engine
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: "queue.Queue[Dict]" = queue.Queue(maxsize=max_queue)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.written = 0
+        self.dropped = 0
+        self.batches = 0
+
+    def submit(self, timestamp: datetime, position: Dict[str, float]) -> bool:
+        """
+        提交一条姿态样本，不阻塞
+
+        Returns:
+            是否成功入队（队列满时返回 False）
+        """
+        try:
+            self._queue.put_nowait({
+                "timestamp": timestamp,
+                "pitch": position["pitch"],
+                "yaw": position["yaw"],
+                "roll": position["roll"],
+            })
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def _flush(self, rows: List[Dict]) -> None:
+        if not rows:
+            return
+        try:
+            with metrics.timer('db.metric_flush'), self._engine.begin() as conn:
+                conn.execute(PostureMetric.__table__.insert(), rows)
+                add_posture_samples(conn, rows)
+            report_cache.touch('metrics')
+            self.written += len(rows)
+            self.batches += 1
+        except Exception as e:
+            self.dropped += len(rows)
+            logger.error("姿态指标写入失败，丢弃 %d 行: %s", len(rows), e)
+
+    def _drain(self, rows: List[Dict]) -> None:
+        while len(rows) < self.batch_size:
+            try:
+                rows.append(self._queue.get_nowait())
+            except queue.Empty:
+                return
+
+    def _run(self) -> None:
+        rows: List[Dict] = []
+        deadline = time.monotonic() + self.flush_interval
+        while not self._stop.is_set():
+            timeout = max(0.0, deadline - time.monotonic())
+            try:
+                rows.append(self._queue.get(timeout=timeout))
+                self._drain(rows)
+            except queue.Empty:
+                pass
+            if len(rows) >= self.batch_size or time.monotonic() >= deadline:
+                self._flush(rows)
+                rows = []
+                deadline = time.monotonic() + self.flush_interval
+        # 退出前写入剩余的全部样本
+        while True:
+            self._drain(rows)
+            if not rows:
+                break
+            self._flush(rows)
+            rows = []
+
+    def start(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="posture-metric-writer", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """停止后台线程，并在退出前写完队列中的样本"""
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join(timeout)
+            self._thread = None
+
+    def stats(self) -> dict:
+        return {
+            "queued": self._queue.qsize(),
+            "written": self.written,
+            "dropped": self.dropped,
+            "batches": self.batches,
+        }
@@ -0,0 +1,15 @@
+from sqlalchemy.engine import Connection
+
+from database import Base
+
+
+def ensure_indexes(conn: Connection) -> None:
+    """
+    为已有数据库补建模型中声明的索引
+
+    create_all 只为新建的表创建索引，旧版本创建的 usage.db 中的表
+    不会自动获得后来新增的索引，这里逐个检查并补建（已存在则跳过）。
+    """
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(conn, checkfirst=True)
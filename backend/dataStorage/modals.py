@@ -5,7 +5,7 @@ from database import Base
 class ScreenSession(Base):
     __tablename__ = 'screen_sessions'
     id = Column(Integer, primary_key=True)
-    start_time = Column(DateTime, nullable=False)  # 使用开始时间
+    start_time = Column(DateTime, nullable=False, index=True)  # 使用开始时间
     end_time = Column(DateTime)                    # 使用结束时间
     # total_duration = Column(Integer)               # 总秒数
 
@@ -13,18 +13,48 @@ class ScreenSession(Base):
 class PostureMetric(Base):
     __tablename__ = 'posture_metrics'
     id = Column(Integer, primary_key=True)
-    timestamp = Column(DateTime, nullable=False)    # 记录时间
+    timestamp = Column(DateTime, nullable=False, index=True)    # 记录时间
     pitch = Column(Float)                  
     yaw = Column(Float)
     roll = Column(Float)
 
 
+# 姿态指标汇总（按小时 / 按天预聚合，随写入增量更新）
+class PostureRollupMixin:
+    bucket = Column(String, primary_key=True)       # 时间桶起点，小时 'YYYY-MM-DD HH:00:00' / 天 'YYYY-MM-DD'
+    count = Column(Integer, nullable=False, default=0)
+    pitch_sum = Column(Float, nullable=False, default=0)
+    pitch_sq = Column(Float, nullable=False, default=0)   # 平方和，用于计算方差
+    pitch_min = Column(Float)
+    pitch_max = Column(Float)
+    yaw_sum = Column(Float, nullable=False, default=0)
+    yaw_sq = Column(Float, nullable=False, default=0)
+    yaw_min = Column(Float)
+    yaw_max = Column(Float)
+    roll_sum = Column(Float, nullable=False, default=0)
+    roll_sq = Column(Float, nullable=False, default=0)
+    roll_min = Column(Float)
+    roll_max = Column(Float)
+
+class PostureHourly(PostureRollupMixin, Base):
+    __tablename__ = 'posture_hourly'
+
+class PostureDaily(PostureRollupMixin, Base):
+    __tablename__ = 'posture_daily'
+
+# 每小时屏幕使用秒数（会话结束时按小时拆分累加）
+class ScreenTimeHourly(Base):
+    __tablename__ = 'screen_time_hourly'
+    bucket = Column(String, primary_key=True)       # 'YYYY-MM-DD HH:00:00'
+    seconds = Column(Float, nullable=False, default=0)
+
+
 # 提醒事件
 class AlertEvent(Base):
     __tablename__ = 'alert_events'
     id = Column(Integer, primary_key=True)
     alert_type = Column(Enum('posture', 'eye'))    # 提醒类型
-    trigger_time = Column(DateTime, nullable=False)
+    trigger_time = Column(DateTime, nullable=False, index=True)
 
 class UserSetting(Base):
     __tablename__ = 'user_settings'
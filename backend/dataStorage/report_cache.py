@@ -0,0 +1,114 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import date
+from typing import Dict, Hashable, Iterable, Optional, Tuple
+
+# 报表依赖的数据类别，写入对应数据时使相关缓存失效
+TOPICS = ('sessions', 'alerts', 'metrics')
+
+
+class CacheEntry:
+    __slots__ = ('body', 'etag', 'generations', 'topics', 'day', 'expires_at')
+
+    def __init__(self, body: bytes, generations: Optional[Tuple[int, ...]], topics: Tuple[str, ...], ttl: float):
+        self.body = body
+        self.etag = '"%s"' % hashlib.sha1(body).hexdigest()
+        # 依赖数据类别在生成时的版本号；None 表示时间范围已结束，内容不会再变化
+        self.generations = generations
+        self.topics = topics
+        self.day = date.today()
+        self.expires_at = time.monotonic() + ttl
+
+
+class ReportCache:
+    """
+    报表接口的响应缓存（LRU + TTL）
+
+    以接口路径和查询参数为键，缓存编码后的 JSON 与对应的 ETag：
+    - 已结束的时间范围（不含今天）内容不会再变化，只受 LRU 淘汰；
+    - 包含今天的范围在 TTL 内有效，且每个数据类别维护一个版本号，
+      写入会话 / 提醒 / 姿态指标时 touch() 对应类别即可 O(1) 使相关缓存失效，
+      日期变化后同样视为失效。
+    """
+
+    def __init__(self, max_entries: int = 256, ttl: float = 300.0):
+        """
+        Args:
+            max_entries: 最多缓存的响应数
+            ttl: 包含今天的响应的最长有效期（秒）
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[Hashable, CacheEntry]" = OrderedDict()
+        self._generations: Dict[str, int] = {topic: 0 for topic in TOPICS}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def touch(self, topic: str) -> None:
+        """某类数据有新写入，使依赖它的未结束范围缓存失效"""
+        with self._lock:
+            self._generations[topic] += 1
+
+    def generations(self, topics: Iterable[str]) -> Tuple[int, ...]:
+        """在查询数据库之前取得版本号快照，查询期间的写入会使结果在存入时即失效"""
+        with self._lock:
+            return tuple(self._generations[topic] for topic in topics)
+
+    def _valid(self, entry: CacheEntry) -> bool:
+        if entry.generations is None:
+            return True
+        return (entry.day == date.today()
+                and time.monotonic() < entry.expires_at
+                and entry.generations == tuple(self._generations[topic] for topic in entry.topics))
+
+    def get(self, key: Hashable) -> Optional[CacheEntry]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._valid(entry):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self,
+            key: Hashable,
+            body: bytes,
+            topics: Tuple[str, ...],
+            generations: Optional[Tuple[int, ...]]) -> CacheEntry:
+        """
+        存入一份响应
+
+        Args:
+            key: 缓存键
+            body: 编码后的响应体
+            topics: 响应依赖的数据类别
+            generations: 查询前取得的版本号快照，None 表示时间范围已结束
+        """
+        entry = CacheEntry(body, generations, topics, self.ttl)
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "generations": dict(self._generations),
+        }
+
+
+report_cache = ReportCache(
+    max_entries=int(os.environ.get('HUC_REPORT_CACHE_SIZE', 256)),
+    ttl=float(os.environ.get('HUC_REPORT_CACHE_TTL', 300)),
+)
@@ -0,0 +1,209 @@
+import argparse
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import delete, select
+from sqlalchemy.engine import Engine
+
+from dataStorage.modals import PostureMetric
+
+logger = logging.getLogger(__name__)
+
+# 与 types/system.py 中 SystemConfig.retention_days 的默认值一致
+DEFAULT_RETENTION_DAYS = 30
+
+
+class RetentionJob:
+    """
+    原始姿态指标的定期清理任务
+
+    posture_metrics 每帧一行，长期使用后数据库会无限增长。小时 / 天汇总表
+    在写入原始样本的同一事务中已经增量更新（见 rollups.add_posture_samples），
+    因此超过保留期的原始样本可以直接删除，报表结果不受影响。
+
+    - 截止时间对齐到当天零点，被删除的总是完整的小时 / 天汇总桶；
+    - 每批只删除 batch_size 行并在批间暂停，单个写事务很短，
+      不会让姿态指标写入线程和提醒写入长时间等待写锁；
+    - 数据库的 auto_vacuum 为 INCREMENTAL 时，删除后以 incremental_vacuum
+      分段归还空闲页；否则空闲页留在文件中由后续写入复用，文件大小同样保持平稳。
+      旧数据库切换到 INCREMENTAL 需要一次完整 VACUUM（持有写锁直到重建结束，
+      并需要约两倍文件大小的磁盘空间），因此不在后台任务中执行，而是停服后手动运行：
+      python -m dataStorage.retention --enable-incremental-vacuum
+    """
+
+    def __init__(self,
+                 engine: Engine,
+                 retention_days: int = DEFAULT_RETENTION_DAYS,
+                 interval: float = 3600.0,
+                 batch_size: int = 500,
+                 batch_pause: float = 0.05,
+                 vacuum_pages: int = 256):
+        """
+        Args:
+            engine: 数据库引擎
+            retention_days: 原始样本保留天数，<= 0 表示不清理
+            interval: 两次清理之间的间隔（秒）
+            batch_size: 每个删除事务的最大行数
+            batch_pause: 批次之间的暂停时间（秒）
+            vacuum_pages: 每次 incremental_vacuum 归还的最大页数
+        """
+        self._engine = engine
+        self.retention_days = retention_days
+        self.interval = interval
+        self.batch_size = batch_size
+        self.batch_pause = batch_pause
+        self.vacuum_pages = vacuum_pages
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.runs = 0
+        self.deleted = 0
+        self.vacuumed_pages = 0
+        self.last_run: Optional[str] = None
+        self.last_error: Optional[str] = None
+        self._incremental_vacuum: Optional[bool] = None
+
+    def cutoff(self, now: Optional[datetime] = None) -> datetime:
+        """早于该时间（当天零点对齐）的原始样本会被删除"""
+        now = now or datetime.now()
+        return datetime.combine(now.date() - timedelta(days=self.retention_days), datetime.min.time())
+
+    def incremental_vacuum_enabled(self) -> bool:
+        """数据库的 auto_vacuum 是否为 INCREMENTAL（只查询一次）"""
+        if self._incremental_vacuum is None:
+            with self._engine.connect() as conn:
+                raw = conn.connection.driver_connection
+                self._incremental_vacuum = raw.execute("PRAGMA auto_vacuum").fetchone()[0] == 2
+        return self._incremental_vacuum
+
+    def _delete_batch(self, cutoff: datetime) -> int:
+        # 子查询沿 timestamp 索引取最早的一批 id
+        oldest = (select(PostureMetric.id)
+                  .where(PostureMetric.timestamp < cutoff)
+                  .order_by(PostureMetric.timestamp)
+                  .limit(self.batch_size))
+        with self._engine.begin() as conn:
+            return conn.execute(delete(PostureMetric).where(PostureMetric.id.in_(oldest))).rowcount
+
+    def _vacuum_step(self) -> int:
+        """归还至多 vacuum_pages 个空闲页，返回归还的页数"""
+        with self._engine.connect() as conn:
+            raw = conn.connection.driver_connection
+            before = raw.execute("PRAGMA freelist_count").fetchone()[0]
+            if not before:
+                return 0
+            # Python 的 execute 每次只推进一步（只归还一页），executescript 会执行到底
+            raw.executescript(f"PRAGMA incremental_vacuum({self.vacuum_pages});")
+            return before - raw.execute("PRAGMA freelist_count").fetchone()[0]
+
+    def run_once(self, now: Optional[datetime] = None) -> int:
+        """
+        执行一次清理
+
+        Returns:
+            删除的原始样本行数
+        """
+        if self.retention_days <= 0:
+            return 0
+        cutoff = self.cutoff(now)
+        deleted = 0
+        while not self._stop.is_set():
+            count = self._delete_batch(cutoff)
+            deleted += count
+            if count < self.batch_size:
+                break
+            time.sleep(self.batch_pause)
+
+        while self.incremental_vacuum_enabled() and not self._stop.is_set():
+            pages = self._vacuum_step()
+            self.vacuumed_pages += pages
+            if pages < self.vacuum_pages:
+                break
+            time.sleep(self.batch_pause)
+
+        self.deleted += deleted
+        self.runs += 1
+        self.last_run = datetime.now().isoformat(timespec='seconds')
+        return deleted
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+                self.last_error = None
+            except Exception as e:
+                self.last_error = str(e)
+                logger.exception("原始数据清理失败")
+            self._stop.wait(self.interval)
+
+    def start(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="metric-retention", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 10.0) -> None:
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join(timeout)
+            self._thread = None
+
+    def stats(self) -> dict:
+        return {
+            "retention_days": self.retention_days,
+            "runs": self.runs,
+            "deleted": self.deleted,
+            "incremental_vacuum": self._incremental_vacuum,
+            "vacuumed_pages": self.vacuumed_pages,
+            "last_run": self.last_run,
+            "last_error": self.last_error,
+        }
+
+
+def create_retention_job(engine: Engine) -> RetentionJob:
+    """按环境变量配置创建清理任务"""
+    return RetentionJob(
+        engine,
+        retention_days=int(os.environ.get('HUC_RETENTION_DAYS', DEFAULT_RETENTION_DAYS)),
+        interval=float(os.environ.get('HUC_RETENTION_INTERVAL', 3600)),
+        batch_size=int(os.environ.get('HUC_RETENTION_BATCH_SIZE', 500)),
+        batch_pause=float(os.environ.get('HUC_RETENTION_BATCH_PAUSE', 0.05)),
+    )
+
+
+def enable_incremental_vacuum(engine: Engine) -> bool:
+    """
+    把数据库的 auto_vacuum 切换为 INCREMENTAL（一次性维护操作）
+
+    需要一次完整 VACUUM：期间持有写锁，且临时占用约两倍文件大小的磁盘空间，
+    应在服务停止时运行。
+
+    Returns:
+        是否执行了切换（已是 INCREMENTAL 时返回 False）
+    """
+    with engine.connect() as conn:
+        raw = conn.connection.driver_connection
+        if raw.execute("PRAGMA auto_vacuum").fetchone()[0] == 2:
+            return False
+        raw.executescript("PRAGMA auto_vacuum=INCREMENTAL; VACUUM;")
+        return True
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="原始姿态指标清理与数据库维护")
+    parser.add_argument('--enable-incremental-vacuum', action='store_true',
+                        help="把数据库切换为 auto_vacuum=INCREMENTAL（完整 VACUUM，需先停止服务）")
+    parser.add_argument('--run-once', action='store_true', help="立即执行一次清理")
+    args = parser.parse_args()
+
+    from database import engine
+    if args.enable_incremental_vacuum:
+        print("已切换为 INCREMENTAL" if enable_incremental_vacuum(engine) else "auto_vacuum 已是 INCREMENTAL")
+    if args.run_once:
+        job = create_retention_job(engine)
+        print(f"删除 {job.run_once()} 行原始样本，归还 {job.vacuumed_pages} 页")
+    if not (args.enable_incremental_vacuum or args.run_once):
+        parser.print_help()
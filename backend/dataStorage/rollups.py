@@ -0,0 +1,179 @@
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import func, select, text
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import Connection
+
+from dataStorage.modals import PostureDaily, PostureHourly, ScreenSession, ScreenTimeHourly
+
+AXES = ('pitch', 'yaw', 'roll')
+HOUR_FORMAT = '%Y-%m-%d %H:00:00'
+DAY_FORMAT = '%Y-%m-%d'
+
+
+def _aggregate_posture(rows: Iterable[Dict], bucket_format: str) -> List[Dict]:
+    """把一批原始姿态样本在内存中按时间桶聚合为汇总行"""
+    buckets: Dict[str, Dict] = {}
+    for row in rows:
+        key = row["timestamp"].strftime(bucket_format)
+        agg = buckets.get(key)
+        if agg is None:
+            agg = buckets[key] = {"bucket": key, "count": 0}
+            for axis in AXES:
+                agg.update({f"{axis}_sum": 0.0, f"{axis}_sq": 0.0,
+                            f"{axis}_min": None, f"{axis}_max": None})
+        agg["count"] += 1
+        for axis in AXES:
+            value = row[axis]
+            if value is None:
+                continue
+            agg[f"{axis}_sum"] += value
+            agg[f"{axis}_sq"] += value * value
+            current_min, current_max = agg[f"{axis}_min"], agg[f"{axis}_max"]
+            agg[f"{axis}_min"] = value if current_min is None else min(current_min, value)
+            agg[f"{axis}_max"] = value if current_max is None else max(current_max, value)
+    return list(buckets.values())
+
+
+def _upsert_posture(conn: Connection, model, aggregates: List[Dict]) -> None:
+    if not aggregates:
+        return
+    table = model.__table__
+    stmt = sqlite_insert(table).values(aggregates)
+    excluded = stmt.excluded
+    updates = {"count": table.c["count"] + excluded["count"]}
+    for axis in AXES:
+        updates[f"{axis}_sum"] = table.c[f"{axis}_sum"] + excluded[f"{axis}_sum"]
+        updates[f"{axis}_sq"] = table.c[f"{axis}_sq"] + excluded[f"{axis}_sq"]
+        # SQLite 的多参数 min/max 遇到 NULL 返回 NULL，先用 coalesce 补齐
+        old_min, new_min = table.c[f"{axis}_min"], excluded[f"{axis}_min"]
+        old_max, new_max = table.c[f"{axis}_max"], excluded[f"{axis}_max"]
+        updates[f"{axis}_min"] = func.min(func.coalesce(old_min, new_min), func.coalesce(new_min, old_min))
+        updates[f"{axis}_max"] = func.max(func.coalesce(old_max, new_max), func.coalesce(new_max, old_max))
+    conn.execute(stmt.on_conflict_do_update(index_elements=[table.c.bucket], set_=updates))
+
+
+def add_posture_samples(conn: Connection, rows: List[Dict]) -> None:
+    """
+    在写入原始样本的同一事务中增量更新小时与天汇总表
+
+    Args:
+        conn: 处于事务中的数据库连接
+        rows: 含 timestamp/pitch/yaw/roll 的原始样本
+    """
+    _upsert_posture(conn, PostureHourly, _aggregate_posture(rows, HOUR_FORMAT))
+    _upsert_posture(conn, PostureDaily, _aggregate_posture(rows, DAY_FORMAT))
+
+
+def split_by_hour(start: datetime, end: datetime) -> List[Tuple[str, float]]:
+    """把时间区间 [start, end) 拆分为每个自然小时内的秒数"""
+    parts = []
+    cursor = start
+    while cursor < end:
+        next_hour = cursor.replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
+        part_end = min(next_hour, end)
+        parts.append((cursor.strftime(HOUR_FORMAT), (part_end - cursor).total_seconds()))
+        cursor = part_end
+    return parts
+
+
+def add_screen_time(conn: Connection, start: datetime, end: datetime) -> None:
+    """把一段使用时间按小时累加到 screen_time_hourly"""
+    parts = split_by_hour(start, end)
+    if not parts:
+        return
+    table = ScreenTimeHourly.__table__
+    stmt = sqlite_insert(table).values([{"bucket": bucket, "seconds": seconds} for bucket, seconds in parts])
+    conn.execute(stmt.on_conflict_do_update(
+        index_elements=[table.c.bucket],
+        set_={"seconds": table.c.seconds + stmt.excluded.seconds},
+    ))
+
+
+def open_session_seconds(conn, now: Optional[datetime] = None) -> Dict[str, float]:
+    """
+    最近一个尚未结束的会话从开始到现在按小时拆分的秒数
+
+    会话结束时才会累加到 screen_time_hourly，查询时用它补上进行中的会话。
+    只统计最近一个会话：更早的未结束会话是异常退出留下的，不应一直累计到现在。
+
+    Args:
+        conn: 数据库连接或会话
+        now: 统计截止时间，默认当前时间
+    """
+    latest = conn.execute(
+        select(ScreenSession.start_time, ScreenSession.end_time)
+        .order_by(ScreenSession.id.desc())
+        .limit(1)
+    ).first()
+    if latest is None or latest.end_time is not None:
+        return {}
+    return dict(split_by_hour(latest.start_time, now or datetime.now()))
+
+
+# 'YYYY-MM-DD HH:MM:SS[.ffffff]' 转为秒数。SQLite 的日期函数把小数秒舍入到毫秒，
+# 因此整秒与小数部分分开取，结果与 split_by_hour 一致
+_EPOCH_SQL = "(strftime('%s', substr({0}, 1, 19)) + CAST(substr({0}, 20) AS REAL))"
+
+# 递归日历 CTE：把每个已结束会话展开为它覆盖的每个自然小时，
+# 再按小时累加 [max(开始, 小时起点), min(结束, 小时终点)) 的秒数；
+# 结束时间恰好在整点时最后一个小时为 0 秒，不写入
+SCREEN_TIME_BY_HOUR_SQL = f"""
+WITH RECURSIVE parts(start_time, end_time, hour_start) AS (
+    SELECT start_time, end_time, strftime('%Y-%m-%d %H:00:00', start_time)
+    FROM screen_sessions
+    WHERE end_time IS NOT NULL AND end_time > start_time
+    UNION ALL
+    SELECT start_time, end_time, datetime(hour_start, '+1 hour')
+    FROM parts
+    WHERE datetime(hour_start, '+1 hour') < end_time
+)
+SELECT hour_start AS bucket,
+       sum({_EPOCH_SQL.format("min(end_time, datetime(hour_start, '+1 hour'))")}
+           - {_EPOCH_SQL.format("max(start_time, hour_start)")}) AS seconds
+FROM parts
+GROUP BY hour_start
+HAVING seconds > 0
+"""
+
+
+def _rebuild_posture(conn: Connection, model, bucket_format: str) -> None:
+    table = model.__table__
+    columns = ["bucket", "count"]
+    selects = [f"strftime('{bucket_format}', timestamp) AS bucket", "count(*)"]
+    for axis in AXES:
+        columns += [f"{axis}_sum", f"{axis}_sq", f"{axis}_min", f"{axis}_max"]
+        selects += [f"total({axis})", f"total({axis} * {axis})", f"min({axis})", f"max({axis})"]
+    # 超过保留期的原始样本已被清理（见 retention.py），更早的汇总桶只存在于汇总表中，
+    # 只重建原始数据仍然覆盖的时间桶
+    first_bucket = f"(SELECT strftime('{bucket_format}', min(timestamp)) FROM posture_metrics)"
+    conn.execute(text(f"DELETE FROM {table.name} WHERE bucket >= {first_bucket}"))
+    conn.execute(text(
+        f"INSERT INTO {table.name} ({', '.join(columns)}) "
+        f"SELECT {', '.join(selects)} FROM posture_metrics GROUP BY bucket"
+    ))
+
+
+def rebuild_rollups(conn: Connection) -> None:
+    """
+    从原始数据重建所有汇总表（用于已有数据库的首次回填或修复）
+
+    姿态汇总只重建原始样本仍覆盖的时间桶，已清理时段的汇总保持不变。
+    """
+    _rebuild_posture(conn, PostureHourly, HOUR_FORMAT)
+    _rebuild_posture(conn, PostureDaily, DAY_FORMAT)
+    conn.execute(ScreenTimeHourly.__table__.delete())
+    conn.execute(text(f"INSERT INTO screen_time_hourly (bucket, seconds) {SCREEN_TIME_BY_HOUR_SQL}"))
+
+
+def ensure_rollups(conn: Connection) -> None:
+    """汇总表为空而原始数据存在时（旧数据库升级后）回填汇总表"""
+    has_rollups = conn.execute(text(
+        "SELECT EXISTS(SELECT 1 FROM posture_hourly) OR EXISTS(SELECT 1 FROM screen_time_hourly)"
+    )).scalar()
+    has_raw = conn.execute(text(
+        "SELECT EXISTS(SELECT 1 FROM posture_metrics) OR EXISTS(SELECT 1 FROM screen_sessions)"
+    )).scalar()
+    if has_raw and not has_rollups:
+        rebuild_rollups(conn)
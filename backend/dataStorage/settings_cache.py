@@ -0,0 +1,71 @@
+import threading
+from typing import Dict, Optional
+
+from sqlalchemy.orm import Session
+
+from dataStorage.modals import UserSetting
+
+# 提醒判定需要的阈值字段
+THRESHOLD_FIELDS = ('yall', 'pitch', 'roll', 'eyeWidth')
+
+_UNLOADED = object()
+
+
+def _snapshot(setting: Optional[UserSetting]) -> Optional[Dict]:
+    if setting is None:
+        return None
+    return {column.name: getattr(setting, column.name) for column in UserSetting.__table__.columns}
+
+
+class SettingsCache:
+    """
+    进程内的用户设置缓存
+
+    首次访问时从数据库读取一次，之后每帧的阈值判定都直接读内存。
+    缓存内容是一个只读快照字典，写入时整体替换引用，读者无需加锁；
+    DataUpdate.updateSettings 在提交成功后写穿（write-through）更新缓存。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._settings = _UNLOADED
+        self.loads = 0
+
+    @property
+    def loaded(self) -> bool:
+        return self._settings is not _UNLOADED
+
+    def get(self, db: Session) -> Optional[Dict]:
+        """
+        获取用户设置快照（调用方不应修改返回的字典）
+
+        Args:
+            db: 缓存未加载时用于读取的数据库会话
+
+        Returns:
+            设置字典，数据库中尚无设置时返回 None
+        """
+        settings = self._settings
+        if settings is _UNLOADED:
+            with self._lock:
+                if self._settings is _UNLOADED:
+                    self._settings = _snapshot(db.query(UserSetting).first())
+                    self.loads += 1
+                settings = self._settings
+        return settings
+
+    def set(self, setting: Optional[UserSetting]) -> None:
+        """数据库提交成功后写入最新设置"""
+        snapshot = _snapshot(setting)
+        with self._lock:
+            self._settings = snapshot
+
+    def thresholds(self) -> Dict[str, float]:
+        """已加载设置中的阈值字段，缓存未加载或无设置时返回空字典"""
+        settings = self._settings
+        if settings is _UNLOADED or settings is None:
+            return {}
+        return {field: settings[field] for field in THRESHOLD_FIELDS}
+
+
+settings_cache = SettingsCache()
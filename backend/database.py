@@ -1,4 +1,77 @@
+import os
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
 from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool, StaticPool
 
 
 Base = declarative_base()
+
+DATABASE_URL = os.environ.get('HUC_DATABASE_URL', 'sqlite:///./usage.db')
+
+
+def create_sqlite_engine(url: str = DATABASE_URL) -> Engine:
+    """
+    创建针对并发访问调优的 SQLite 引擎
+
+    每个新连接上设置：
+    - journal_mode=WAL：读写互不阻塞，只有写与写之间串行；
+    - synchronous=NORMAL：WAL 模式下仍能保证一致性，提交时少一次 fsync；
+    - busy_timeout：遇到写锁时等待而不是立即报 "database is locked"；
+    - auto_vacuum=INCREMENTAL：仅对尚未建表的新数据库生效，之后保留策略删除的
+      页可以用 incremental_vacuum 分批归还；已有数据库的切换需要一次完整 VACUUM，
+      见 python -m dataStorage.retention --enable-incremental-vacuum。
+    文件数据库显式使用 QueuePool（SQLAlchemy 1.4 对文件 SQLite 默认是 NullPool），
+    大小可通过 HUC_DB_POOL_SIZE / HUC_DB_MAX_OVERFLOW / HUC_DB_POOL_TIMEOUT 配置；
+    内存数据库（sqlite://）使用 StaticPool，所有线程共享同一个连接，
+    否则每个线程各自得到一个空的内存库。
+    """
+    busy_timeout_ms = int(os.environ.get('HUC_DB_BUSY_TIMEOUT_MS', 5000))
+    database = make_url(url).database
+    if not database or database == ':memory:' or 'mode=memory' in database:
+        pool_args = {"poolclass": StaticPool}
+    else:
+        pool_args = {
+            "poolclass": QueuePool,
+            "pool_size": int(os.environ.get('HUC_DB_POOL_SIZE', 5)),
+            "max_overflow": int(os.environ.get('HUC_DB_MAX_OVERFLOW', 10)),
+            "pool_timeout": float(os.environ.get('HUC_DB_POOL_TIMEOUT', 30)),
+        }
+    engine = create_engine(
+        url,
+        # 请求处理线程与后台写入线程共享连接池中的连接
+        connect_args={"check_same_thread": False},
+        **pool_args,
+    )
+
+    @event.listens_for(engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        # auto_vacuum 必须在创建第一张表之前设置
+        if cursor.execute("SELECT count(*) FROM sqlite_master").fetchone()[0] == 0:
+            cursor.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute(f"PRAGMA busy_timeout={busy_timeout_ms}")
+        cursor.close()
+
+    return engine
+
+
+engine = create_sqlite_engine()
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+def get_db():
+    """
+    FastAPI 依赖：每个请求使用独立的数据库会话，请求结束后归还连接
+
+    用法: def handler(db: Session = Depends(get_db))
+    """
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
@@ -0,0 +1,137 @@
+import itertools
+import json
+import logging
+import os
+import sys
+import time
+from typing import Dict, Optional
+
+# LogRecord 的内置属性，其余属性视为通过 extra 传入的结构化字段
+_RECORD_ATTRS = frozenset(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+_configured = False
+
+
+class JsonFormatter(logging.Formatter):
+    """每条日志输出一行 JSON，extra 中的字段原样并入"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(record.created)) + f".{int(record.msecs):03d}",
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+def parse_levels(spec: str) -> Dict[str, str]:
+    """
+    解析按模块设置的日志级别
+
+    Args:
+        spec: 形如 "cvmodals.eye_predict=DEBUG,dataStorage=WARNING" 的字符串
+
+    Returns:
+        {logger 名: 级别名}
+    """
+    levels = {}
+    for item in spec.split(','):
+        name, sep, level = item.partition('=')
+        if sep and name.strip() and level.strip():
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def configure_logging(level: Optional[str] = None,
+                      module_levels: Optional[str] = None,
+                      fmt: Optional[str] = None) -> None:
+    """
+    配置根日志（重复调用无副作用）
+
+    - HUC_LOG_LEVEL: 全局级别，默认 INFO；
+    - HUC_LOG_LEVELS: 按模块覆盖级别，如 "cvmodals=DEBUG"；
+    - HUC_LOG_FORMAT: text（默认）或 json，json 时每条日志为一行结构化记录。
+    日志写到 stderr，由 StreamHandler 加锁串行化，不与 uvicorn 自身的访问日志混杂。
+
+    Args:
+        level: 全局级别，默认读取 HUC_LOG_LEVEL
+        module_levels: 按模块的级别，默认读取 HUC_LOG_LEVELS
+        fmt: 输出格式，默认读取 HUC_LOG_FORMAT
+    """
+    global _configured
+    if _configured:
+        return
+    level = level or os.environ.get('HUC_LOG_LEVEL', 'INFO')
+    module_levels = module_levels if module_levels is not None else os.environ.get('HUC_LOG_LEVELS', '')
+    fmt = fmt or os.environ.get('HUC_LOG_FORMAT', 'text')
+
+    handler = logging.StreamHandler(sys.stderr)
+    if fmt == 'json':
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(name)s: %(message)s'))
+    root = logging.getLogger()
+    root.addHandler(handler)
+    root.setLevel(level.upper())
+    for name, module_level in parse_levels(module_levels).items():
+        logging.getLogger(name).setLevel(module_level)
+    _configured = True
+
+
+class LogSampler:
+    """
+    采样的日志开关
+
+    可能按帧反复出现的日志（如客户端持续发送损坏的图片）在对应级别开启时、
+    且每 every 次调用中只输出一次，避免刷屏：
+
+        if _invalid_frame_sample():
+            logger.warning("无法解码的帧: %s", e)
+    """
+
+    def __init__(self, logger: logging.Logger, level: int = logging.WARNING, every: Optional[int] = None):
+        """
+        Args:
+            logger: 所属模块的 logger
+            level: 被采样的日志级别
+            every: 每多少次调用输出一次，默认读取 HUC_LOG_SAMPLE（100），1 表示不采样
+        """
+        self.logger = logger
+        self.level = level
+        self.every = max(1, every or int(os.environ.get('HUC_LOG_SAMPLE', 100)))
+        # itertools.count 的 next() 在 GIL 下是原子的，多线程调用无需加锁
+        self._calls = itertools.count()
+
+    def __call__(self) -> bool:
+        if not self.logger.isEnabledFor(self.level):
+            return False
+        return next(self._calls) % self.every == 0
+
+
+class DebugSampler(LogSampler):
+    """
+    采样的调试日志开关
+
+    热路径上每帧都会经过的调试输出只在 DEBUG 级别开启时、且每 every 次调用中
+    取一次，写法为：
+
+        if _debug_sample():
+            logger.debug("预处理后的图像形状: %s", image.shape)
+
+    DEBUG 未开启时只有一次 isEnabledFor 判断（logging 内部有缓存），
+    不会格式化任何字符串，也不会写 stdout / stderr。
+    """
+
+    def __init__(self, logger: logging.Logger, every: Optional[int] = None):
+        """
+        Args:
+            logger: 所属模块的 logger
+            every: 每多少次调用输出一次，默认读取 HUC_LOG_SAMPLE（100），1 表示不采样
+        """
+        super().__init__(logger, logging.DEBUG, every)
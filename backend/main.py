@@ -1,21 +1,65 @@
 import asyncio
+import json
+import logging
+import time
 from datetime import date, datetime, timedelta
-from typing import List, Optional
-from fastapi import FastAPI, Body, HTTPException
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from fastapi import FastAPI, Body, Depends, HTTPException, Request, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy import create_engine, func
-from sqlalchemy.orm import sessionmaker
-from dataStorage.crud.usage import AlertCorrelationResponse, DataAccess, DataUpdate, PostureMetricResponse, ScreenSessionResponse
-from cvmodals.eye_predict import predict_eye
-from database import Base
-from dataStorage.modals import AlertEvent, ScreenSession, UserSetting
-from cvmodals.predict import process_image
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
+from sqlalchemy.orm import Session
+from dataStorage.crud.usage import AlertCorrelationResponse, DataAccess, DataUpdate, PostureMetricResponse
+from database import Base, engine, get_db
+from dataStorage.modals import ScreenSession, UserSetting
+from dataStorage.db_executor import run_db, shutdown_db_executor, stream_db
+from dataStorage.metric_writer import PostureMetricWriter
+from dataStorage.report_cache import report_cache
+from dataStorage.retention import create_retention_job
+from dataStorage.settings_cache import settings_cache
+from dataStorage.migrations import ensure_indexes
+from dataStorage.rollups import add_screen_time, ensure_rollups
+from cvmodals.predict import pose_batcher
+from cvmodals.pipeline import LatestFrameSlot, analyze_frame
+from cvmodals.model_registry import registry
+from cvmodals.posture_alert import create_posture_engine
+from cvmodals.eye_state import create_eye_engine
+from cvmodals.face_roi import create_face_tracker, face_roi_enabled
+from cvmodals.frame_filter import create_scene_filter
+from cvmodals.session_state import SessionStore
+from cvmodals.worker_pool import QueueFullError, inference_pool
+from metrics import metrics
+from log_config import LogSampler, configure_logging
 import os
 
+configure_logging()
+logger = logging.getLogger(__name__)
+# 损坏 / 无法解码的帧可能每帧出现一次，只采样记录，总数见 frames_invalid 计数
+_invalid_frame_sample = LogSampler(logger)
+
 app = FastAPI()
-#数据库配置
-engine = create_engine('sqlite:///./usage.db')
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# 每帧姿态样本经内存队列批量写入 posture_metrics
+metric_writer = PostureMetricWriter(
+    engine,
+    batch_size=int(os.environ.get('HUC_METRIC_BATCH_SIZE', 200)),
+    flush_interval=float(os.environ.get('HUC_METRIC_FLUSH_INTERVAL', 2.0)),
+    max_queue=int(os.environ.get('HUC_METRIC_MAX_QUEUE', 10000)),
+)
+# 定期删除超过保留期（HUC_RETENTION_DAYS，默认 30 天）的原始姿态样本，汇总表保留
+retention_job = create_retention_job(engine)
+
+# 每个会话独立的姿态提醒状态机
+posture_engines = SessionStore(create_posture_engine)
+# 每个会话独立的眼部状态引擎（眨眼频率、闭眼时长）
+eye_engines = SessionStore(create_eye_engine)
+# 每个会话独立的画面变化预过滤器，画面未变化时复用上一次结果
+scene_filters = SessionStore(create_scene_filter)
+# 每个会话独立的人脸区域跟踪器（HUC_FACE_ROI=1 时启用）
+face_trackers = SessionStore(create_face_tracker)
+
+
+def session_face_tracker(session_key):
+    return face_trackers.get(session_key) if face_roi_enabled() else None
 
 # Set up CORS
 app.add_middleware(
@@ -32,6 +76,63 @@ app.add_middleware(
 @app.on_event("startup")
 def init_db():
     Base.metadata.create_all(bind=engine)
+    # 旧数据库升级：补建索引，并从原始数据回填汇总表
+    with engine.begin() as conn:
+        ensure_indexes(conn)
+        ensure_rollups(conn)
+    metric_writer.start()
+    retention_job.start()
+
+@app.on_event("shutdown")
+def flush_metrics():
+    retention_job.stop()
+    metric_writer.stop()
+    shutdown_db_executor()
+
+# 预加载并预热ONNX模型，避免首帧请求承担加载开销
+@app.on_event("startup")
+def load_models():
+    registry.preload()
+
+@app.on_event("shutdown")
+def shutdown_inference_pool():
+    inference_pool.shutdown()
+
+
+@app.get("/video/batch-stats")
+def get_batch_stats():
+    """姿态推理微批处理的队列深度与批大小分布"""
+    return pose_batcher.stats()
+
+
+@app.get("/video/pool-stats")
+def get_pool_stats():
+    """推理工作池的在途帧数与丢帧统计"""
+    return inference_pool.stats()
+
+
+def _numeric(prefix: str, stats: dict) -> dict:
+    return {f"{prefix}_{key}": value for key, value in stats.items()
+            if isinstance(value, (int, float)) and not isinstance(value, bool)}
+
+
+# 已有组件的即时状态在导出时读取，作为 gauge 暴露
+metrics.add_collector(lambda: _numeric("inference_pool", inference_pool.stats()))
+metrics.add_collector(lambda: _numeric("pose_batcher", pose_batcher.stats()))
+metrics.add_collector(lambda: _numeric("metric_writer", metric_writer.stats()))
+metrics.add_collector(lambda: _numeric("report_cache", report_cache.stats()))
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    """各处理阶段的耗时直方图（含 p50/p95/p99）、计数器与组件状态，Prometheus 文本格式"""
+    return PlainTextResponse(metrics.render_prometheus(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/metrics/summary")
+def get_metrics_summary():
+    """各处理阶段的样本数与 p50/p95/p99 耗时（毫秒）"""
+    return metrics.summary()
 
 
 @app.get("/data")
@@ -40,39 +141,206 @@ def get_data():
 
 
 
+async def load_thresholds() -> dict:
+    """读取用户设置的阈值，缓存已加载时直接读内存，不访问数据库"""
+    if settings_cache.loaded:
+        return settings_cache.thresholds()
+    return await run_db(DataAccess.get_thresholds)
+
+
+async def record_alert_event(alert_type: str) -> None:
+    """
+    由服务端状态机直接记录提醒事件
+
+    状态机在调用前已进入提醒状态，写入失败（如超过 busy_timeout 仍被锁）时
+    只记录日志，不影响本帧结果的返回，也不会中断 WebSocket 连接。
+    """
+    try:
+        await run_db(DataUpdate.add_alert_event, alert_type)
+    except Exception:
+        metrics.inc('alert_writes_failed')
+        logger.exception("提醒事件写入失败: %s", alert_type)
+
+
+async def evaluate_posture(session_key, position: dict, thresholds: dict) -> dict:
+    """
+    记录姿态样本并推进会话的姿态提醒状态机，触发时写入 AlertEvent
+
+    Returns:
+        提醒判定：posture 表示本帧是否触发提醒，另附状态机当前状态与平滑后的角度
+    """
+    metric_writer.submit(datetime.now(), position)
+    posture_engine = posture_engines.get(session_key)
+    fired = posture_engine.update(position, thresholds)
+    if fired:
+        metrics.inc('alerts_fired')
+        await record_alert_event('posture')
+    return {"posture": fired, **posture_engine.snapshot()}
+
+
+async def evaluate_eyes(session_key, detections: List[Dict], thresholds: dict) -> dict:
+    """
+    由眼部检测框推进会话的眼部状态引擎，触发时写入 eye 类型的 AlertEvent
+
+    Returns:
+        提醒判定：eye 表示本帧是否触发提醒，另附眼部状态、眨眼频率与闭眼时长
+    """
+    eye_engine = eye_engines.get(session_key)
+    fired = eye_engine.update(detections, thresholds)
+    if fired:
+        metrics.inc('alerts_fired')
+        await record_alert_event('eye')
+    return {"eye": fired, **eye_engine.snapshot()}
+
+
+async def evaluate_alerts(session_key, result: dict, thresholds: dict) -> dict:
+    """
+    推进姿态与眼部两个状态机，合并为一帧的提醒判定
+
+    画面变化预过滤器命中（cached）时返回的是上一帧的检测框，眨眼这类细小变化
+    正好会被过滤掉，因此缓存帧不推进眼部状态引擎，只返回其当前状态。
+    """
+    alert = await evaluate_posture(session_key, result['position'], thresholds)
+    if result['cached']:
+        alert["eyes"] = {"eye": False, **eye_engines.get(session_key).snapshot()}
+    else:
+        alert["eyes"] = await evaluate_eyes(session_key, result['detections'], thresholds)
+    return alert
+
+
+def log_invalid_frame(error: ValueError) -> None:
+    """客户端发送的帧无法解码：计数并按采样记录 WARNING，不打印堆栈"""
+    metrics.inc('frames_invalid')
+    if _invalid_frame_sample():
+        logger.warning("无法解析的视频帧（每 %d 次记录一次）: %s", _invalid_frame_sample.every, error)
+
+
 @app.post("/video/analyze")
-async def analyze_video_frame(frame_data: bytes = Body(...)):
+async def analyze_video_frame(frame_data: bytes = Body(...), session_id: Optional[int] = None):
     """
     HTTP视频分析接口
-    接收视频帧并返回分析结果
+    接收视频帧并返回分析结果；服务端按会话平滑姿态并判定是否提醒，
+    触发的提醒直接记录为 AlertEvent，客户端无需再调用 /alert
     """
     try:
-        # 使用模型处理图像
-        analysis_result = process_image( frame_data)
-    #     return {
-    #     'yaw': float(pred_ypr[0]),
-    #     'pitch': float(pred_ypr[1]),
-    #     'roll': float(pred_ypr[2])
-    # }
-        # analysis_result = predict_eye(frame_data) #TODO 
+        # 在途帧已满时直接丢帧，避免推理积压拖慢其他接口
+        with inference_pool.slot():
+            # 单次解码，同时完成头部姿态与眼部检测
+            scene_filter = scene_filters.get(session_id)
+            with metrics.timer('frame.analyze'):
+                analysis_result = await analyze_frame(frame_data, scene_filter, session_face_tracker(session_id))
+        thresholds = await load_thresholds()
+        alert = await evaluate_alerts(session_id, analysis_result, thresholds)
         return {
-            'detections':[],
-            'position':analysis_result
+            'detections': analysis_result['detections'],
+            'position': analysis_result['position'],
+            'alert': alert,
+            'sampling': {'cached': analysis_result['cached'], **scene_filter.stats()}
         }
+    except QueueFullError as e:
+        metrics.inc('frames_dropped')
+        raise HTTPException(status_code=429, detail=f"frame dropped: {str(e)}")
+    except ValueError as e:
+        log_invalid_frame(e)
+        raise HTTPException(status_code=400, detail=f"invalid frame: {str(e)}")
     except Exception as e:
-        print(f"分析失败: {str(e)}")
+        logger.exception("分析失败")
         return {"error": str(e)}
 
+
+@app.websocket("/ws/video")
+async def video_stream(websocket: WebSocket, max_fps: float = 0, session_id: Optional[int] = None):
+    """
+    WebSocket视频流分析接口
+    客户端持续发送二进制JPEG帧，服务端推送姿态、眼部检测结果与提醒判定。
+    推理跟不上时只处理最新一帧，跳过的帧数随结果一起返回；
+    max_fps 限制每个连接的最大处理帧率（0 表示不限制），
+    也可以通过文本消息 {"max_fps": n} 动态调整。
+    未指定 session_id 时，提醒状态机随连接创建和销毁。
+    """
+    await websocket.accept()
+    session_key = session_id if session_id is not None else f"ws-{id(websocket)}"
+
+    slot = LatestFrameSlot()
+    scene_filter = scene_filters.get(session_key)
+    flow = {"max_fps": max_fps}
+
+    async def receive_frames():
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                return
+            if message.get("bytes"):
+                slot.put(message["bytes"])
+            elif message.get("text"):
+                try:
+                    flow["max_fps"] = float(json.loads(message["text"]).get("max_fps", flow["max_fps"]))
+                except (ValueError, TypeError, AttributeError):
+                    pass
+
+    receiver = asyncio.create_task(receive_frames())
+    try:
+        while True:
+            next_frame = asyncio.create_task(slot.get())
+            await asyncio.wait({next_frame, receiver}, return_when=asyncio.FIRST_COMPLETED)
+            if not next_frame.done():
+                # 客户端已断开
+                next_frame.cancel()
+                break
+            frame = next_frame.result()
+            started = time.monotonic()
+            try:
+                with inference_pool.slot(), metrics.timer('frame.analyze'):
+                    result = await analyze_frame(frame, scene_filter, session_face_tracker(session_key))
+                # 每帧读取阈值（缓存加载后只是一次内存读取），设置更新可立即作用于进行中的连接
+                alert = await evaluate_alerts(session_key, result, await load_thresholds())
+            except QueueFullError as e:
+                metrics.inc('frames_dropped')
+                await websocket.send_json({"type": "dropped", "detail": str(e)})
+                continue
+            except ValueError as e:
+                log_invalid_frame(e)
+                await websocket.send_json({"type": "error", "error": str(e)})
+                continue
+            except Exception as e:
+                logger.exception("分析失败")
+                await websocket.send_json({"type": "error", "error": str(e)})
+                continue
+
+            await websocket.send_json({
+                "type": "result",
+                "position": result['position'],
+                "detections": result['detections'],
+                "alert": alert,
+                "sampling": {"cached": result['cached'], **scene_filter.stats()},
+                "received": slot.received,
+                "skipped": slot.skipped,
+            })
+
+            # 按连接限制处理帧率，期间到达的帧只保留最新一帧
+            if flow["max_fps"] > 0:
+                delay = 1.0 / flow["max_fps"] - (time.monotonic() - started)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        receiver.cancel()
+        if session_id is None:
+            posture_engines.pop(session_key)
+            eye_engines.pop(session_key)
+            scene_filters.pop(session_key)
+            face_trackers.pop(session_key)
+
 # 开始使用记录
 @app.post("/session/start")
-def start_session():
-    db = SessionLocal()
+def start_session(db: Session = Depends(get_db)):
     try:
         # 创建新会话
         new_session = ScreenSession(start_time=datetime.now())
         db.add(new_session)
 
-        setting = db.query(UserSetting).first()
+        setting = DataAccess.get_user_settings(db)
         if not setting:
             # 创建默认设置
             default_setting = UserSetting(
@@ -85,117 +353,211 @@ def start_session():
             db.add(default_setting)
         
         db.commit()  # 统一提交
+        report_cache.touch('sessions')
         
         # 重新获取设置数据（如果新建了默认设置）
-        current_setting = setting or default_setting
+        if not setting:
+            settings_cache.set(default_setting)
+        current_setting = settings_cache.get(db)
 
         return {
             "session_id": new_session.id,
             "settings": {
-                "alter_method": "music" if current_setting.alter_method == 1 else "silence",
-                "yall": current_setting.yall,
-                "roll": current_setting.roll,
-                "pitch":current_setting.pitch,
-                "eyeWidth":current_setting.eyeWidth
+                "alter_method": "music" if current_setting["alter_method"] == 1 else "silence",
+                "yall": current_setting["yall"],
+                "roll": current_setting["roll"],
+                "pitch":current_setting["pitch"],
+                "eyeWidth":current_setting["eyeWidth"]
             }
         }
 
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
-    finally:
-        db.close()
 # 结束使用记录
 @app.post("/session/end")
-def end_session():
-    db = SessionLocal()
+def end_session(db: Session = Depends(get_db)):
     session = db.query(ScreenSession).order_by(ScreenSession.id.desc()).first()
-    if session:
+    # 只结束仍在进行中的会话，避免重复调用时重复累加使用时长
+    if session and session.end_time is None:
         session.end_time = datetime.now()
         session.total_duration = int((session.end_time - session.start_time).total_seconds())
+        # 使用时长按小时拆分累加到汇总表，与会话结束在同一事务中提交
+        add_screen_time(db.connection(), session.start_time, session.end_time)
         db.commit()
+        report_cache.touch('sessions')
+        posture_engines.pop(session.id)
+        eye_engines.pop(session.id)
+        scene_filters.pop(session.id)
+        face_trackers.pop(session.id)
+    posture_engines.pop(None)
+    eye_engines.pop(None)
+    scene_filters.pop(None)
+    face_trackers.pop(None)
     return {"status": "ok"}
 
 
+def cache_key(request: Request) -> Tuple:
+    return request.url.path, tuple(sorted(request.query_params.multi_items()))
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    tags = {tag.strip() for tag in header.split(",")}
+    return "*" in tags or etag in tags or f"W/{etag}" in tags
+
+
+async def cached_json(request: Request,
+                      topics: Tuple[str, ...],
+                      build: Callable[[], Awaitable[Any]],
+                      closed: bool = False) -> Response:
+    """
+    带缓存与 ETag 的 JSON 报表响应
+
+    Args:
+        request: 当前请求，路径与查询参数作为缓存键
+        topics: 报表依赖的数据类别（sessions / alerts / metrics）
+        build: 缓存未命中时生成报表数据的协程函数
+        closed: 时间范围是否已结束（不含今天），已结束的结果不会过期
+
+    Returns:
+        客户端 If-None-Match 与当前 ETag 一致时返回 304，否则返回 JSON
+    """
+    key = cache_key(request)
+    entry = report_cache.get(key)
+    if entry is None:
+        generations = None if closed else report_cache.generations(topics)
+        body = JSONResponse(content=jsonable_encoder(await build())).body
+        entry = report_cache.put(key, body, topics, generations)
+    headers = {"ETag": entry.etag, "Cache-Control": "no-cache"}
+    if etag_matches(request, entry.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=entry.body, media_type="application/json", headers=headers)
+
+
+@app.get("/report/retention-stats")
+def get_retention_stats():
+    """原始姿态样本清理任务的运行统计"""
+    return retention_job.stats()
+
+
+@app.get("/report/cache-stats")
+def get_report_cache_stats():
+    """报表响应缓存的命中统计"""
+    return report_cache.stats()
+
+
 @app.get("/report/daily")
-def daily_report():
-    db = SessionLocal()
+async def daily_report(request: Request):
     today = datetime.now().date()
     seven_days_ago = today - timedelta(days=7)
-    
-    # 使用时长统计
-    usage = db.query(
-        func.sum(ScreenSession.total_duration).label('total_duration'),
-        func.count().label('sessions')
-    ).filter(
-        ScreenSession.start_time >= seven_days_ago,
-        ScreenSession.start_time < today + timedelta(days=1)
-    ).first()
-    
-    # 提醒统计
-    alerts = db.query(
-        AlertEvent.alert_type,
-        func.count().label('count')
-    ).filter(
-        AlertEvent.trigger_time >= seven_days_ago,
-        AlertEvent.trigger_time < today + timedelta(days=1)
-    ).group_by(AlertEvent.alert_type).all()
+
+    async def build():
+        report = await run_db(DataAccess.get_daily_report, seven_days_ago, today)
+        return {"date": today.isoformat(), **report}
+
+    return await cached_json(request, ('sessions', 'alerts'), build)
+
+
+# 请求头 Accept 包含该类型时，报表以 NDJSON（每行一个 JSON 对象）流式返回
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+def wants_ndjson(request: Request) -> bool:
+    return NDJSON_MEDIA_TYPE in request.headers.get("accept", "")
+
+
+def ndjson_response(chunks: AsyncIterator[List[Dict]]) -> StreamingResponse:
+    """把按块产出的结果逐块编码为 NDJSON 返回，不在内存中物化完整列表"""
+    async def body():
+        async for chunk in chunks:
+            yield "".join(json.dumps(item, ensure_ascii=False) + "\n" for item in chunk)
+    return StreamingResponse(body(), media_type=NDJSON_MEDIA_TYPE)
+
+
+def group_hourly_usage(rows: Iterable[Dict]) -> Iterator[Dict]:
+    """把按时间排序的小时使用记录合并为每天一条 {date, hourly_usage}"""
+    current = None
+    for item in rows:
+        if current is None or current["date"] != item["date"]:
+            if current is not None:
+                yield current
+            current = {"date": item["date"], "hourly_usage": {}}
+        current["hourly_usage"][f"{int(item['hour']):02d}"] = round(item["duration_hours"], 2)
+    if current is not None:
+        yield current
+
+
+def iter_daily_usage(db: Session, start_date: date, end_date: date) -> Iterator[Dict]:
+    return group_hourly_usage(DataAccess.iter_screen_sessions(db, start_date, end_date))
+
+
+def format_posture_metric(item: Dict) -> Dict:
     return {
-        "date": today.isoformat(),
-        "total_usage_seconds": usage.total_duration or 0,
-        "sessions": usage.sessions or 0,
-        "alerts": {alert_type: count for alert_type, count in alerts}
+        "timestamp": item["timestamp"],
+        "pitch": round(item["pitch"], 1),
+        "yaw": round(item["yaw"], 1),
+        "roll": round(item["roll"], 1)
     }
 
 
+def iter_posture_response(db: Session, time_bucket: str) -> Iterator[Dict]:
+    return map(format_posture_metric, DataAccess.iter_posture_metrics(db, time_bucket))
+
+
 @app.get("/report/screen-sessions")
 async def read_screen_sessions(
+    request: Request,
     start_date: date,
     end_date: date,
 ):
-    db = SessionLocal()
+    if wants_ndjson(request):
+        return ndjson_response(stream_db(iter_daily_usage, start_date, end_date))
+
+    async def build():
+        raw_data = await run_db(DataAccess.get_screen_sessions, start_date, end_date)
+        return list(group_hourly_usage(raw_data))
+
     try:
-        raw_data = DataAccess.get_screen_sessions(db, start_date, end_date)
-        processed = {}
-        for item in raw_data:
-            date_str = item["date"]
-            if date_str not in processed:
-                processed[date_str] = {"date": item["date"], "hourly_usage": {}}
-            processed[date_str]["hourly_usage"][f"{int(item['hour']):02d}"] = round(item["duration_hours"]*24, 2)
-        return list(processed.values())
+        return await cached_json(request, ('sessions',), build, closed=end_date < date.today())
     except Exception as e:
         raise HTTPException(500, detail=f"查询失败: {str(e)}")
 
 @app.get("/posture-metrics", response_model=List[PostureMetricResponse])
 async def read_posture_metrics(
+    request: Request,
     time_bucket: Optional[str] = "H",
 ):
-    db = SessionLocal()
     try:
         valid_buckets = ['H','D','W','M']
         if time_bucket not in valid_buckets:
             raise ValueError("无效的时间分桶参数")
-        
-        data = DataAccess.get_posture_metrics(db, time_bucket)
-        return [{
-            "timestamp": item["timestamp"].to_pydatetime(),
-            "pitch": round(item["pitch"], 1),
-            "yaw": round(item["yall"], 1),
-            "roll":round(item["roll"],1)
-        } for item in data]
+
+        if wants_ndjson(request):
+            return ndjson_response(stream_db(iter_posture_response, time_bucket))
+
+        async def build():
+            data = await run_db(DataAccess.get_posture_metrics, time_bucket)
+            return [format_posture_metric(item) for item in data]
+
+        return await cached_json(request, ('metrics',), build)
     except Exception as e:
         raise HTTPException(400, detail=str(e))
 
 @app.get("/alert-correlation", response_model=List[AlertCorrelationResponse])
-async def read_alert_correlation():
-    db = SessionLocal()
-    try:
-        data = DataAccess.get_alert_correlation(db)
+async def read_alert_correlation(request: Request):
+    async def build():
+        data = await run_db(DataAccess.get_alert_correlation)
         return [{
             "date": item["date"],
             "total_duration_hours": round(item["total_duration_hours"], 2),
             "alert_count": item["alert_count"]
         } for item in data]
+
+    try:
+        return await cached_json(request, ('sessions', 'alerts'), build)
     except Exception as e:
         raise HTTPException(500, detail=f"数据获取失败: {str(e)}")
 
@@ -204,31 +566,29 @@ async def read_alert_correlation():
 async def add_alert_event(
     alert_type: str = Body(..., embed=True)  # 从请求体获取参数
 ):
-    db = SessionLocal()
-    event = AlertEvent(alert_type=alert_type, trigger_time=datetime.now())
-    db.add(event)
-    db.commit()
-    db.refresh(event)
-    if event.id is None:
+    event_id = await run_db(DataUpdate.add_alert_event, alert_type)
+    if event_id is None:
         raise HTTPException(status_code=500, detail="事件添加失败")
-    return event.id
+    return event_id
 
 @app.post("/user-setting")
 async def post_user_settings(data:dict):
-    db = SessionLocal()
     try:
-        new_setting = DataUpdate.updateSettings(db=db,data=data)
+        new_setting = await run_db(DataUpdate.updateSettings, data)
         return new_setting
     except HTTPException as e:
         raise e;
 
 @app.get("/user-setting")
 async def get_user_settings():
-    db = SessionLocal()
     try:
-        settings = db.query(UserSetting).first()
+        # 设置缓存已加载时直接返回内存中的快照
+        if settings_cache.loaded:
+            settings = settings_cache.get(None)
+        else:
+            settings = await run_db(DataAccess.get_user_settings)
         if(settings):
-            return settings
+            return dict(settings)
 
         else:
             return{}
@@ -0,0 +1,170 @@
+import functools
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, List, Tuple
+
+# 延迟直方图的桶上界（秒），覆盖 0.25ms ~ 10s
+LATENCY_BUCKETS = (0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+                   0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class Histogram:
+    """
+    固定桶的延迟直方图
+
+    每次记录只做一次二分查找和几次整数加法，内存占用固定，不保存原始样本；
+    分位数由桶计数线性插值估算，精度取决于桶的划分。
+    """
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        # 最后一个桶对应 +Inf
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.sum += value
+
+    def quantile(self, q: float) -> float:
+        """估算分位数（秒），没有样本时返回 0"""
+        with self._lock:
+            counts, total = list(self.counts), self.count
+        if total == 0:
+            return 0.0
+        rank = q * total
+        seen = 0
+        for index, bucket_count in enumerate(counts):
+            if seen + bucket_count >= rank and bucket_count:
+                lower = self.buckets[index - 1] if index > 0 else 0.0
+                upper = self.buckets[index] if index < len(self.buckets) else self.buckets[-1]
+                return lower + (upper - lower) * (rank - seen) / bucket_count
+            seen += bucket_count
+        return self.buckets[-1]
+
+
+class _Timer:
+    """with 块计时器（比 contextmanager 生成器开销更小）"""
+    __slots__ = ('histogram', 'started')
+
+    def __init__(self, histogram: Histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.histogram.observe(time.perf_counter() - self.started)
+        return False
+
+
+class MetricsRegistry:
+    """
+    进程内的阶段耗时与计数器登记处，以 Prometheus 文本格式导出
+
+    - observe / timer / timed：按阶段名记录耗时直方图；
+    - inc：累加计数器；
+    - add_collector：注册返回 {指标名: 数值} 的函数，导出时作为 gauge 读取，
+      用于暴露已有组件（推理池、写入器、缓存等）的即时状态。
+    """
+
+    def __init__(self, prefix: str = 'huc'):
+        self.prefix = prefix
+        self._histograms: Dict[str, Histogram] = {}
+        self._counters: Dict[str, int] = {}
+        self._collectors: List[Callable[[], Dict[str, float]]] = []
+        self._lock = threading.Lock()
+
+    def _histogram(self, stage: str) -> Histogram:
+        histogram = self._histograms.get(stage)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(stage, Histogram())
+        return histogram
+
+    def observe(self, stage: str, seconds: float) -> None:
+        self._histogram(stage).observe(seconds)
+
+    def timer(self, stage: str) -> _Timer:
+        """记录 with 块的耗时"""
+        return _Timer(self._histogram(stage))
+
+    def timed(self, stage: str) -> Callable:
+        """记录函数每次调用耗时的装饰器"""
+        def decorator(fn: Callable) -> Callable:
+            histogram = self._histogram(stage)
+
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    return fn(*args, **kwargs)
+                finally:
+                    histogram.observe(time.perf_counter() - started)
+            return wrapper
+        return decorator
+
+    def inc(self, name: str, value: int = 1) -> None:
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def add_collector(self, collector: Callable[[], Dict[str, float]]) -> None:
+        self._collectors.append(collector)
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """各阶段的样本数与 p50/p95/p99（毫秒），便于直接查看"""
+        return {
+            stage: {
+                "count": histogram.count,
+                **{f"p{int(q * 100)}_ms": round(histogram.quantile(q) * 1000, 3) for q in QUANTILES},
+            }
+            for stage, histogram in sorted(self._histograms.items())
+        }
+
+    def render_prometheus(self) -> str:
+        """导出为 Prometheus 文本格式（0.0.4）"""
+        latency = f"{self.prefix}_stage_latency_seconds"
+        lines = [
+            f"# HELP {latency} Latency of each processing stage.",
+            f"# TYPE {latency} histogram",
+        ]
+        for stage, histogram in sorted(self._histograms.items()):
+            with histogram._lock:
+                counts, total, value_sum = list(histogram.counts), histogram.count, histogram.sum
+            cumulative = 0
+            for bound, bucket_count in zip(histogram.buckets, counts):
+                cumulative += bucket_count
+                lines.append(f'{latency}_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+            lines.append(f'{latency}_bucket{{stage="{stage}",le="+Inf"}} {total}')
+            lines.append(f'{latency}_sum{{stage="{stage}"}} {value_sum}')
+            lines.append(f'{latency}_count{{stage="{stage}"}} {total}')
+
+        quantile_name = f"{self.prefix}_stage_latency_quantile_seconds"
+        lines += [
+            f"# HELP {quantile_name} Estimated latency quantiles of each processing stage.",
+            f"# TYPE {quantile_name} gauge",
+        ]
+        for stage, histogram in sorted(self._histograms.items()):
+            for q in QUANTILES:
+                lines.append(f'{quantile_name}{{stage="{stage}",quantile="{q}"}} {histogram.quantile(q)}')
+
+        with self._lock:
+            counters = sorted(self._counters.items())
+        for name, value in counters:
+            lines += [f"# TYPE {self.prefix}_{name}_total counter", f"{self.prefix}_{name}_total {value}"]
+
+        for collector in self._collectors:
+            for name, value in sorted(collector().items()):
+                lines += [f"# TYPE {self.prefix}_{name} gauge", f"{self.prefix}_{name} {float(value)}"]
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
@@ -0,0 +1,69 @@
+"""
+提醒与使用时长关联报表的回归测试
+
+使用时长与提醒次数分别按天聚合后再合并：同一天的提醒再多，
+total_duration_hours 也不能随提醒条数成倍放大（会话与提醒按天连接时的笛卡尔积）。
+"""
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from database import Base, create_sqlite_engine
+from dataStorage import modals  # noqa: F401  注册模型
+from dataStorage.crud.usage import DataAccess
+from dataStorage.modals import AlertEvent, ScreenSession
+from dataStorage.rollups import add_screen_time
+
+SESSIONS = [
+    (datetime(2024, 3, 1, 9, 0), datetime(2024, 3, 1, 11, 0)),
+    (datetime(2024, 3, 1, 14, 0), datetime(2024, 3, 1, 15, 0)),
+    # 跨午夜：3 月 1 日 0.5 小时，3 月 2 日 0.25 小时
+    (datetime(2024, 3, 1, 23, 30), datetime(2024, 3, 2, 0, 15)),
+]
+
+
+@pytest.fixture
+def db(tmp_path):
+    engine = create_sqlite_engine(f"sqlite:///{tmp_path / 'usage.db'}")
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        for start, end in SESSIONS:
+            conn.execute(ScreenSession.__table__.insert().values(start_time=start, end_time=end))
+            add_screen_time(conn, start, end)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+def add_alerts(db, day, count):
+    db.add_all(AlertEvent(alert_type='posture', trigger_time=day + timedelta(minutes=i)) for i in range(count))
+    db.commit()
+
+
+def test_alerts_do_not_multiply_duration(db):
+    add_alerts(db, datetime(2024, 3, 1, 10, 0), 7)
+    add_alerts(db, datetime(2024, 3, 3, 8, 0), 2)
+
+    rows = {row["date"]: row for row in DataAccess.get_alert_correlation(db)}
+
+    assert sorted(rows) == ["2024-03-01", "2024-03-02", "2024-03-03"]
+    assert rows["2024-03-01"]["total_duration_hours"] == pytest.approx(3.5)
+    assert rows["2024-03-01"]["alert_count"] == 7
+    # 有使用、无提醒
+    assert rows["2024-03-02"]["total_duration_hours"] == pytest.approx(0.25)
+    assert rows["2024-03-02"]["alert_count"] == 0
+    # 有提醒、无使用
+    assert rows["2024-03-03"]["total_duration_hours"] == 0.0
+    assert rows["2024-03-03"]["alert_count"] == 2
+
+
+def test_duration_independent_of_alert_count(db):
+    def duration():
+        rows = DataAccess.get_alert_correlation(db)
+        return {row["date"]: row["total_duration_hours"] for row in rows}
+
+    before = duration()
+    add_alerts(db, datetime(2024, 3, 1, 10, 0), 50)
+    assert duration() == before
@@ -0,0 +1,59 @@
+"""
+并发写入的负载回归测试
+
+多个线程同时通过 create_sqlite_engine 创建的连接池写入提醒事件，
+确认 WAL + busy_timeout 配置下不会出现 "database is locked"，且没有丢失写入；
+同时确认内存数据库（sqlite://）在多个线程间共享同一个库。
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import func
+from sqlalchemy.orm import sessionmaker
+
+from database import Base, create_sqlite_engine
+from dataStorage import modals  # noqa: F401  注册模型
+from dataStorage.crud.usage import DataUpdate
+from dataStorage.modals import AlertEvent
+
+WRITERS = 8
+WRITES_PER_WRITER = 50
+
+
+def write_alerts(Session, count):
+    with Session() as db:
+        for _ in range(count):
+            DataUpdate.add_alert_event(db, 'posture')
+
+
+def count_alerts(Session):
+    with Session() as db:
+        return db.query(func.count(AlertEvent.id)).scalar()
+
+
+def test_concurrent_writers_do_not_lock(tmp_path):
+    engine = create_sqlite_engine(f"sqlite:///{tmp_path / 'usage.db'}")
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+    try:
+        with ThreadPoolExecutor(WRITERS) as pool:
+            futures = [pool.submit(write_alerts, Session, WRITES_PER_WRITER) for _ in range(WRITERS)]
+            for future in futures:
+                future.result()  # OperationalError（database is locked）会在这里抛出
+        assert count_alerts(Session) == WRITERS * WRITES_PER_WRITER
+        assert engine.pool.checkedout() == 0
+        with engine.connect() as conn:
+            assert conn.exec_driver_sql("PRAGMA journal_mode").scalar() == 'wal'
+    finally:
+        engine.dispose()
+
+
+def test_memory_database_is_shared_across_threads():
+    engine = create_sqlite_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+    try:
+        with ThreadPoolExecutor(2) as pool:
+            pool.submit(write_alerts, Session, 3).result()
+            assert pool.submit(count_alerts, Session).result() == 3
+    finally:
+        engine.dispose()
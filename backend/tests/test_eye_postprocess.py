@@ -0,0 +1,128 @@
+"""
+眼部检测后处理的等价性与性能回归测试
+
+pos_process / select_detections 已改为整列向量运算。这里用逐行循环的参考实现
+（与改写前的逻辑相同）对 1000 个随机检测框比对输出，并确认向量化版本更快。
+"""
+import time
+
+import numpy as np
+import pytest
+
+from cvmodals.eye_predict import nms, pos_process, select_detections
+
+N = 1000
+ORIGINAL_SHAPE = (480, 640)
+RESIZED_SHAPE = (480, 640)
+PADDING = (80, 0)
+CLASS_NAMES = ['eyes']
+
+
+def random_outputs(n=N, seed=0):
+    """模拟模型输出：(1, N, 5) 的 [x1, y1, x2, y2, score] 与 (1, N) 的类别"""
+    rng = np.random.default_rng(seed)
+    xy = rng.uniform(-20, 660, size=(n, 2))
+    wh = rng.uniform(1, 120, size=(n, 2))
+    dets = np.concatenate([xy, xy + wh, rng.uniform(0, 1, size=(n, 1))], axis=1).astype(np.float32)
+    labels = rng.integers(0, 3, size=n).astype(np.int64)
+    return [dets[None], labels[None]]
+
+
+def reference_pos_process(outputs, original_shape, resized_shape, class_names=CLASS_NAMES,
+                          score_threshold=0.3, padding=(0, 0)):
+    """逐行循环的参考实现"""
+    dets, labels = outputs[0][0], outputs[1][0]
+    orig_h, orig_w = original_shape
+    scale_x = orig_w / resized_shape[1]
+    scale_y = orig_h / resized_shape[0]
+    pad_top, pad_left = padding
+    detections = []
+    for i in range(dets.shape[0]):
+        x1, y1, x2, y2, score = (float(v) for v in dets[i])
+        if score < score_threshold:
+            continue
+        x1 = int(round((x1 - pad_left) * scale_x))
+        y1 = int(round((y1 - pad_top) * scale_y))
+        x2 = int(round((x2 - pad_left) * scale_x))
+        y2 = int(round((y2 - pad_top) * scale_y))
+        x1 = max(0, min(x1, orig_w - 1))
+        y1 = max(0, min(y1, orig_h - 1))
+        x2 = max(x1 + 1, min(x2, orig_w))
+        y2 = max(y1 + 1, min(y2, orig_h))
+        label = int(labels[i])
+        detections.append({
+            "x1": x1, "y1": y1, "x2": x2, "y2": y2,
+            "score": round(score, 4),
+            "label": label,
+            "label_text": class_names[label] if label < len(class_names) else f'unknown_{label}',
+        })
+    return detections
+
+
+def reference_nms(dets, labels, score_threshold, iou_threshold):
+    """逐对计算 IoU 的按类别贪心 NMS，返回保留框的下标（按得分降序）"""
+    candidates = [i for i in np.argsort(-dets[:, 4], kind='stable') if dets[i, 4] >= score_threshold]
+    keep = []
+    for i in candidates:
+        suppressed = False
+        for j in keep:
+            if labels[i] != labels[j]:
+                continue
+            ix = max(min(dets[i, 2], dets[j, 2]) - max(dets[i, 0], dets[j, 0]), 0)
+            iy = max(min(dets[i, 3], dets[j, 3]) - max(dets[i, 1], dets[j, 1]), 0)
+            area_i = (dets[i, 2] - dets[i, 0]) * (dets[i, 3] - dets[i, 1])
+            area_j = (dets[j, 2] - dets[j, 0]) * (dets[j, 3] - dets[j, 1])
+            if ix * iy / (area_i + area_j - ix * iy) > iou_threshold:
+                suppressed = True
+                break
+        if not suppressed:
+            keep.append(i)
+    return keep
+
+
+def best_of(fn, repeat=5):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_pos_process_matches_reference(seed):
+    outputs = random_outputs(seed=seed)
+    kwargs = dict(original_shape=ORIGINAL_SHAPE, resized_shape=RESIZED_SHAPE,
+                  class_names=CLASS_NAMES, padding=PADDING)
+    assert pos_process(outputs, **kwargs) == reference_pos_process(outputs, **kwargs)
+
+
+def test_select_detections_nms_matches_reference():
+    outputs = random_outputs(n=300, seed=1)
+    dets, labels = outputs[0][0], outputs[1][0]
+    kept, kept_labels = select_detections(dets, labels, 0.3, nms_iou=0.5)
+    expected = reference_nms(dets, labels, 0.3, 0.5)
+    np.testing.assert_array_equal(kept, dets[expected])
+    np.testing.assert_array_equal(kept_labels, labels[expected])
+
+
+def test_select_detections_top_k():
+    dets, labels = (array[0] for array in random_outputs(seed=2))
+    kept, _ = select_detections(dets, labels, 0.3, top_k=10)
+    np.testing.assert_array_equal(kept[:, 4], np.sort(dets[dets[:, 4] >= 0.3, 4])[::-1][:10])
+    kept, _ = select_detections(dets, labels, 0.3, top_k=10, nms_iou=0.5)
+    assert len(kept) == 10
+
+
+def test_nms_keeps_highest_of_overlapping_pair():
+    boxes = np.array([[0, 0, 10, 10], [1, 1, 10, 10], [20, 20, 30, 30]], dtype=np.float32)
+    scores = np.array([0.6, 0.9, 0.8], dtype=np.float32)
+    assert nms(boxes, scores, 0.5).tolist() == [1, 2]
+
+
+def test_pos_process_faster_than_reference():
+    outputs = random_outputs()
+    kwargs = dict(original_shape=ORIGINAL_SHAPE, resized_shape=RESIZED_SHAPE, padding=PADDING)
+    vectorized = best_of(lambda: pos_process(outputs, **kwargs))
+    reference = best_of(lambda: reference_pos_process(outputs, **kwargs))
+    assert vectorized < reference
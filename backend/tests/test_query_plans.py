@@ -0,0 +1,82 @@
+"""
+报表查询的索引使用回归测试
+
+在临时数据库中建表后删除时间列索引（模拟旧版本的 usage.db），由 ensure_indexes 补建，
+再对 DataAccess 实际发出的 SQL 执行 EXPLAIN QUERY PLAN，确认时间范围查询走索引。
+"""
+from datetime import date
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.orm import sessionmaker
+
+from database import Base, create_sqlite_engine
+from dataStorage import modals  # noqa: F401  注册模型
+from dataStorage.crud.usage import DataAccess
+from dataStorage.migrations import ensure_indexes
+
+INDEXES = ('ix_screen_sessions_start_time', 'ix_alert_events_trigger_time', 'ix_posture_metrics_timestamp')
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_sqlite_engine(f"sqlite:///{tmp_path / 'usage.db'}")
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        for name in INDEXES:
+            conn.exec_driver_sql(f"DROP INDEX {name}")
+        ensure_indexes(conn)
+    yield engine
+    engine.dispose()
+
+
+def capture_statements(engine, fn):
+    """执行 fn(db) 并记录期间发出的所有 (SQL, 参数)"""
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        with sessionmaker(bind=engine)() as db:
+            fn(db)
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+    return statements
+
+
+def query_plan(engine, statement, parameters) -> str:
+    with engine.connect() as conn:
+        rows = conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters).fetchall()
+    return "\n".join(row[-1] for row in rows)
+
+
+def plans_for(engine, fn, predicate):
+    plans = [query_plan(engine, statement, parameters)
+             for statement, parameters in capture_statements(engine, fn)
+             if predicate in statement]
+    assert plans, f"没有发出包含 {predicate!r} 的查询"
+    return plans
+
+
+def test_ensure_indexes_restores_missing_indexes(engine):
+    with engine.connect() as conn:
+        names = {row[0] for row in conn.exec_driver_sql("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    assert set(INDEXES) <= names
+
+
+def test_screen_session_range_uses_start_time_index(engine):
+    plans = plans_for(engine,
+                      lambda db: DataAccess.get_daily_report(db, date(2025, 1, 1), date(2025, 1, 31)),
+                      "screen_sessions.start_time >=")
+    for plan in plans:
+        assert "USING" in plan and "INDEX ix_screen_sessions_start_time" in plan, plan
+
+
+def test_alert_event_range_uses_trigger_time_index(engine):
+    plans = plans_for(engine,
+                      lambda db: DataAccess.get_daily_report(db, date(2025, 1, 1), date(2025, 1, 31)),
+                      "alert_events.trigger_time >=")
+    for plan in plans:
+        assert "USING" in plan and "INDEX ix_alert_events_trigger_time" in plan, plan
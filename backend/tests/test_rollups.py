@@ -0,0 +1,105 @@
+"""
+屏幕时间小时汇总的回归测试
+
+rebuild_rollups 用递归日历 CTE 在 SQLite 中按小时拆分会话，
+会话结束时的增量路径则用 Python 的 split_by_hour 拆分。两者必须给出相同的结果，
+包括微秒级时间戳、恰好落在整点上的端点以及跨小时 / 跨午夜的会话。
+"""
+import random
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from database import Base, create_sqlite_engine
+from dataStorage import modals  # noqa: F401  注册模型
+from dataStorage.modals import ScreenSession, ScreenTimeHourly
+from dataStorage.rollups import add_screen_time, rebuild_rollups, split_by_hour
+
+EDGE_SESSIONS = [
+    # 同一小时内，带微秒
+    (datetime(2024, 3, 1, 9, 15, 0, 250000), datetime(2024, 3, 1, 9, 45, 30, 750000)),
+    # 端点恰好在整点
+    (datetime(2024, 3, 1, 10, 0), datetime(2024, 3, 1, 11, 0)),
+    # 跨越多个小时
+    (datetime(2024, 3, 1, 11, 59, 59, 999999), datetime(2024, 3, 1, 14, 0, 0, 1)),
+    # 跨午夜
+    (datetime(2024, 3, 1, 23, 30, 0, 123456), datetime(2024, 3, 2, 1, 15)),
+    # 跨月末
+    (datetime(2024, 2, 29, 23, 59, 59), datetime(2024, 3, 1, 0, 0, 1)),
+]
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_sqlite_engine(f"sqlite:///{tmp_path / 'usage.db'}")
+    Base.metadata.create_all(bind=engine)
+    yield engine
+    engine.dispose()
+
+
+def random_sessions(count, seed=0):
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 1)
+    sessions = []
+    for _ in range(count):
+        start += timedelta(seconds=rng.uniform(0, 6 * 3600), microseconds=rng.randrange(10 ** 6))
+        end = start + timedelta(seconds=rng.uniform(1, 4 * 3600), microseconds=rng.randrange(10 ** 6))
+        sessions.append((start, end))
+        start = end
+    return sessions
+
+
+def expected_hours(sessions):
+    """按 split_by_hour 累加的期望值"""
+    expected = {}
+    for start, end in sessions:
+        for bucket, seconds in split_by_hour(start, end):
+            expected[bucket] = expected.get(bucket, 0.0) + seconds
+    return expected
+
+
+def rollup_hours(engine):
+    with engine.connect() as conn:
+        return {row.bucket: row.seconds for row in conn.execute(select(ScreenTimeHourly))}
+
+
+def assert_same_hours(actual, expected):
+    assert actual.keys() == expected.keys()
+    for bucket, seconds in expected.items():
+        assert actual[bucket] == pytest.approx(seconds, abs=1e-6), bucket
+
+
+@pytest.mark.parametrize("sessions", [EDGE_SESSIONS, random_sessions(200)], ids=["edges", "random"])
+def test_rebuild_matches_split_by_hour(engine, sessions):
+    with Session(engine) as db:
+        db.add_all(ScreenSession(start_time=start, end_time=end) for start, end in sessions)
+        # 未结束的会话和时长为 0 的会话不计入
+        db.add(ScreenSession(start_time=datetime(2024, 6, 1, 8, 0)))
+        db.add(ScreenSession(start_time=datetime(2024, 6, 1, 9, 0), end_time=datetime(2024, 6, 1, 9, 0)))
+        db.commit()
+
+    with engine.begin() as conn:
+        rebuild_rollups(conn)
+    assert_same_hours(rollup_hours(engine), expected_hours(sessions))
+
+
+def test_incremental_matches_rebuild(engine):
+    sessions = EDGE_SESSIONS + random_sessions(50, seed=1)
+    with engine.begin() as conn:
+        for start, end in sessions:
+            conn.execute(ScreenSession.__table__.insert().values(start_time=start, end_time=end))
+            add_screen_time(conn, start, end)
+    incremental = rollup_hours(engine)
+
+    with engine.begin() as conn:
+        rebuild_rollups(conn)
+    assert_same_hours(rollup_hours(engine), incremental)
+
+
+def test_split_by_hour_edges():
+    assert split_by_hour(datetime(2024, 3, 1, 10, 0), datetime(2024, 3, 1, 11, 0)) == [("2024-03-01 10:00:00", 3600.0)]
+    assert split_by_hour(datetime(2024, 3, 1, 10, 0), datetime(2024, 3, 1, 10, 0)) == []
+    parts = split_by_hour(datetime(2024, 3, 1, 23, 59, 59, 500000), datetime(2024, 3, 2, 0, 0, 0, 250000))
+    assert parts == [("2024-03-01 23:00:00", 0.5), ("2024-03-02 00:00:00", 0.25)]